@@ -0,0 +1,104 @@
+"""Micro-benchmarks for the tonal tension hot paths.
+
+Run from the ``backend`` directory, e.g.::
+
+    python -m jass.bench voice_leading --rows 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from .tis_index import TISIndex
+from .tonal_tension.voice_leading import voice_leading_tension, voice_leading_tension_batch
+
+
+DEFAULT_INDEX = Path(__file__).resolve().parent / "tis_index.npz"
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_voice_leading(
+    index: TISIndex,
+    *,
+    rows: int = 3,
+    addition_penalty: int = 4,
+    repeat: int = 3,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Compare the per-pair `voice_leading_tension` loop with the batched solver.
+
+    Each sampled row is scored against every row of the index by both paths; the
+    per-pair loop runs once (it is slow), the batched solver takes the best of
+    `repeat` runs. Reports per-row seconds and the max absolute difference.
+    """
+    bits = np.asarray(index.chroma_bits)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(bits.shape[0], size=min(rows, bits.shape[0]), replace=False)
+
+    per_pair_s = 0.0
+    batch_s = 0.0
+    max_abs_diff = 0.0
+    for r in sample.tolist():
+        prev = bits[r].tolist()
+        t0 = time.perf_counter()
+        ref = np.array(
+            [
+                voice_leading_tension(prev, b.tolist(), addition_penalty=addition_penalty)
+                for b in bits
+            ],
+            dtype=np.float64,
+        )
+        per_pair_s += time.perf_counter() - t0
+
+        out = voice_leading_tension_batch(bits[r], bits, addition_penalty=addition_penalty)
+        batch_s += _best_of(
+            lambda: voice_leading_tension_batch(bits[r], bits, addition_penalty=addition_penalty),
+            repeat,
+        )
+        max_abs_diff = max(max_abs_diff, float(np.max(np.abs(out - ref))))
+
+    n = int(sample.shape[0])
+    return {
+        "benchmark": "voice_leading",
+        "rows": n,
+        "candidates": int(bits.shape[0]),
+        "per_pair_s_per_row": per_pair_s / n,
+        "batch_s_per_row": batch_s / n,
+        "speedup": per_pair_s / batch_s if batch_s > 0 else float("inf"),
+        "max_abs_diff": max_abs_diff,
+    }
+
+
+BENCHMARKS: dict[str, Callable[..., dict[str, Any]]] = {
+    "voice_leading": bench_voice_leading,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX)
+    parser.add_argument("--rows", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    index = TISIndex.from_npz(args.index)
+    report = BENCHMARKS[args.benchmark](index, rows=args.rows)
+    for k, v in report.items():
+        print(f"{k:>20}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,42 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Mapping, Sequence
 
-from .chroma_index import chroma_bits_to_notes, filter_slash_suggestions
+import numpy as np
+
+from .chroma_index import (
+    bits_to_mask,
+    chroma_bits_to_notes,
+    filter_slash_suggestions,
+    parse_chroma,
+)
+from .index_registry import INDEX_REGISTRY
+from .lru import CacheInfo, LRUCache
 from .tis_index import TISIndex
-from .tonal_tension import DEFAULT_WEIGHTS, parse_key
+from .tonal_tension import DEFAULT_WEIGHTS, compute_features, parse_key
+from .tonal_tension.constraints import ChordConstraints, as_constraints
+from .tonal_tension.features import compute_features_batch
+from .tonal_tension.key_features import key_id
+from .tonal_tension.lookahead import beam_search_progressions
+from .tonal_tension.model import (
+    format_suggestions,
+    rank_candidates,
+    rank_candidates_batch,
+    required_features,
+    resolve_query_rows,
+    suggest_for_profiles,
+    suggest_next_chords_anytime,
+)
 from .tonal_tension.model import suggest_next_chords as _suggest_next_chords
+from .tonal_tension.topk import TopKTable, load_topk_table
+from .tonal_tension.theory import PC_TO_IDX
+
+
+# Canonical feature sets kept per index by the transposition-canonical cache.
+FEATURE_CACHE_SIZE = 256
 
 
-def _load_index(index: str | Path | TISIndex) -> TISIndex:
+def load_index(index: str | Path | TISIndex) -> TISIndex:
+    """Resolve `index` to a shared, read-only `TISIndex` via `INDEX_REGISTRY`."""
     if isinstance(index, TISIndex):
         return index
     index_path = Path(index)
@@ -25,13 +54,97 @@ def _load_index(index: str | Path | TISIndex) -> TISIndex:
         candidate = Path(__file__).resolve().parent / index_path
         if candidate.exists():
             index_path = candidate
-    return TISIndex.from_npz(index_path)
+    return INDEX_REGISTRY.get(index_path)
+
+
+def _feature_cache(idx: TISIndex) -> LRUCache[dict[str, np.ndarray]]:
+    return idx.memo("suggestion_feature_cache", lambda: LRUCache(FEATURE_CACHE_SIZE))
+
+
+def _canonical_features(
+    idx: TISIndex,
+    prev_row: int,
+    progression_rows: Sequence[int] | None,
+    key_root: str,
+    key_mode: str,
+    voice_leading_addition_penalty: int,
+    features: frozenset[str],
+) -> dict[str, np.ndarray]:
+    """Features of every row for a query, via a transposition-canonical LRU cache.
+
+    Every feature is invariant under transposing the key, the context and the
+    candidate together, so the query is transposed to tonic C and evaluated over
+    `TISIndex.transposition_closure` (the index itself is not closed under
+    transposition). The cached closure features are gathered back to the index rows,
+    so e.g. (G7, key C) and (D7, key G) share one entry. Function labels are
+    tie-stable under this rotation (see `harmonic_function_codes_from_tis`), so
+    h matches the uncached path. Ranking is left to the caller: weights, goal
+    and top are not part of the cache key.
+    """
+    cols = idx.closure_columns(-PC_TO_IDX[key_root])
+    prev_col = int(cols[prev_row])
+    prog_cols = tuple(int(c) for c in cols[list(progression_rows or ())])
+    cache_key = (key_mode, prev_col, prog_cols, voice_leading_addition_penalty, features)
+    cache = _feature_cache(idx)
+    feats = cache.get(cache_key)
+    if feats is None:
+        feats = compute_features(
+            idx.transposition_closure(),
+            prev_col,
+            "C",
+            key_mode,
+            progression_rows=list(prog_cols) or None,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=features,
+        )
+        for arr in feats.values():
+            arr.setflags(write=False)
+        cache.put(cache_key, feats)
+    return {name: arr[cols] for name, arr in feats.items()}
+
+
+def suggestion_cache_info(index: str | Path | TISIndex = "tis_index.npz") -> CacheInfo:
+    """Hit/miss counters of the transposition-canonical feature cache for `index`."""
+    return _feature_cache(load_index(index)).info()
+
+
+def _resolve_chroma(idx: TISIndex, chroma: str | Sequence[int]) -> dict[str, Any]:
+    """Map a detector chroma (bits or `parse_chroma` text) to its nearest indexed chord."""
+    bits = parse_chroma(chroma) if isinstance(chroma, str) else [int(b) for b in chroma]
+    mask = bits_to_mask(bits)
+    row = idx.nearest_row_for_mask(mask)
+    if row is None:
+        raise ValueError("chroma must have at least one active pitch class.")
+    return {
+        "chroma": bits,
+        "row": row,
+        "chord": idx.rep_names[row],
+        "exact": idx.row_for_mask(mask) is not None,
+        "distance": bin(mask ^ int(idx.chroma_mask[row])).count("1"),
+    }
+
+
+def decorate_results(
+    idx: TISIndex, results: list[dict], *, flats: bool, include_aliases: bool
+) -> None:
+    """Post-process notes + aliases for backend convenience (in place)."""
+    for r in results:
+        row = int(r["row"])
+        if flats:
+            r["notes"] = chroma_bits_to_notes(idx.chroma_bits[row].tolist(), flats=True)
+        if include_aliases:
+            r["aliases"] = idx.aliases_for_row(row)
+        else:
+            r["aliases_count"] = int(idx.alias_offsets[row + 1] - idx.alias_offsets[row])
+        r["representatives_all"] = idx.reps_for_row(row)
+        r["representatives"] = filter_slash_suggestions(r["representatives_all"])
 
 
 def suggest_chords(
     *,
     chord: str | None = None,
     progression: Sequence[str] | None = None,
+    chroma: str | Sequence[int] | None = None,
     key: str,
     index: str | Path | TISIndex = "tis_index.npz",
     top: int = 10,
@@ -41,6 +154,11 @@ def suggest_chords(
     voice_leading_addition_penalty: int = 4,
     flats: bool = False,
     include_aliases: bool = False,
+    cache: bool = False,
+    topk: str | Path | TopKTable | None = None,
+    features: Sequence[str] | None = None,
+    deadline_ms: float | None = None,
+    constraints: ChordConstraints | Mapping[str, Any] | None = None,
 ) -> dict[str, Any]:
     """Suggest next chords.
 
@@ -52,10 +170,16 @@ def suggest_chords(
     progression:
         Optional progression context ending in ``chord``. If provided, hierarchical
         tension is computed for each candidate as if appended.
+    chroma:
+        Alternative to ``chord``: a 12-bit chroma (list of 0/1 or any format accepted
+        by `parse_chroma`), e.g. straight from a detector. It resolves to the nearest
+        indexed chord (fewest differing notes, then TIS distance), so noisy or partial
+        chords still get suggestions; ``query["resolved"]`` reports the match.
     key:
         Human-friendly key string, e.g. ``"C"``, ``"Am"``, ``"F# minor"``.
     index:
-        Path to ``tis_index.npz`` or an in-memory ``TISIndex``.
+        Path to ``tis_index.npz`` (or a ``TISIndex.to_npy_dir`` directory, which is
+        memory-mapped) or an in-memory ``TISIndex``.
     top:
         Number of results to return.
     goal:
@@ -70,16 +194,60 @@ def suggest_chords(
         If True, spell note names with flats (db/eb/gb/ab/bb).
     include_aliases:
         If True, include alias lists for each result (can be large).
+    cache:
+        If True, reuse candidate features across queries that are transpositions of
+        each other (see `suggestion_cache_info` for hit rates). Function labels and
+        tree heads are chosen with tie tolerances, so they match the uncached path;
+        the angles d2/d3 differ from it by up to ~1e-7 (arccos rounding) and the
+        other features by float rounding. Exactly tied candidates may therefore
+        swap places, but scores do not change. The uncached path already keeps
+        recent voice-leading rows per index, so exact repeats of a query are no
+        faster (a hit still gathers every feature back to the index rows); the
+        cache pays off for transposed queries whose voice-leading row is cold,
+        e.g. many keys of the same progression.
+    topk:
+        Optional offline top-k table (`jass.tonal_tension.topk`, path or loaded).
+        Single-chord queries with default weights are answered from it; anything
+        else falls back to live computation.
+    features:
+        Extra features (of d1, d2, d3, c, m, h) to compute and report. Only
+        features with a non-zero weight are computed otherwise; the rest are
+        absent from the results.
+    deadline_ms:
+        Optional time budget for live play. Candidates are ranked on the cheap
+        features first and the slow ones (voice leading, hierarchical tension) are
+        computed for as many as the budget allows; ``refinement`` (also set on
+        each result) reports how far that got, and features not yet computed are
+        left out of a result (see `suggest_next_chords_anytime`). Ignored when
+        ``topk`` serves the query.
+    constraints:
+        Optional `ChordConstraints` (or a mapping of its fields), e.g.
+        ``{"min_notes": 3, "max_notes": 5, "diatonic": True, "exclude_slash": True}``.
+        Only candidates passing every constraint are scored; features are
+        normalized over them. Takes precedence over ``topk``, ``cache`` and
+        ``deadline_ms``.
 
     Returns
     -------
-    dict with keys: query, goal, weights, results, meta
+    dict with keys: query, goal, weights, results, refinement, meta
     """
-    idx = _load_index(index)
+    idx = load_index(index)
+    want = required_features(weights, features)
     key_root, key_mode = parse_key(key)
+    constraints = as_constraints(constraints)
 
     prog_list = list(progression) if progression else None
     chosen_chord = chord
+    resolved = None
+    if chroma is not None:
+        if chord is not None:
+            raise ValueError("Pass either chord or chroma, not both.")
+        resolved = _resolve_chroma(idx, chroma)
+        chosen_chord = resolved["chord"]
+        if prog_list:
+            if idx.row_for_name(prog_list[-1]) != resolved["row"]:
+                raise ValueError("chroma must match the last chord in progression.")
+            chosen_chord = prog_list[-1]
     if prog_list:
         if chosen_chord is None:
             chosen_chord = prog_list[-1]
@@ -88,30 +256,156 @@ def suggest_chords(
     if chosen_chord is None:
         raise ValueError("Either chord or progression must be provided.")
 
-    results = _suggest_next_chords(
+    prev_row, progression_rows = resolve_query_rows(idx, chosen_chord, prog_list)
+    table = load_topk_table(topk) if isinstance(topk, (str, Path)) else topk
+    use_table = (
+        table is not None
+        and constraints is None
+        and not progression_rows
+        and table.serves(
+            idx,
+            goal=goal,
+            top=top,
+            weights=weights,
+            normalize=normalize,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+        )
+    )
+    refinement = "exact"
+    if use_table or constraints is not None:
+        results = _suggest_next_chords(
+            idx,
+            chosen_chord,
+            key_root,
+            key_mode,
+            top=top,
+            weights=dict(weights) if weights is not None else None,
+            goal=goal,
+            progression=prog_list,
+            normalize=normalize,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            topk=table,
+            features=want,
+            constraints=constraints,
+        )
+    elif deadline_ms is not None:
+        results, refinement = suggest_next_chords_anytime(
+            idx,
+            chosen_chord,
+            key_root,
+            key_mode,
+            deadline_ms=deadline_ms,
+            top=top,
+            weights=dict(weights) if weights is not None else None,
+            goal=goal,
+            progression=prog_list,
+            normalize=normalize,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=want,
+        )
+    else:
+        if cache:
+            feats = _canonical_features(
+                idx,
+                prev_row,
+                progression_rows,
+                key_root,
+                key_mode,
+                voice_leading_addition_penalty,
+                want,
+            )
+        else:
+            feats = compute_features(
+                idx,
+                prev_row,
+                key_root,
+                key_mode,
+                progression_rows=progression_rows,
+                voice_leading_addition_penalty=voice_leading_addition_penalty,
+                features=want,
+            )
+        order, tension = rank_candidates(
+            feats,
+            prev_row,
+            weights=dict(weights) if weights is not None else None,
+            goal=goal,
+            normalize=normalize,
+            size=idx.tis.shape[0],
+        )
+        results = format_suggestions(idx, order[:top], feats, tension)
+
+    decorate_results(idx, results, flats=flats, include_aliases=include_aliases)
+
+    query: dict[str, Any] = {
+        "chord": chosen_chord,
+        "progression": prog_list,
+        "key": f"{key_root} {key_mode}",
+    }
+    if resolved is not None:
+        query["chroma"] = resolved.pop("chroma")
+        query["resolved"] = resolved
+    return {
+        "query": query,
+        "goal": goal,
+        "weights": dict(weights) if weights is not None else dict(DEFAULT_WEIGHTS),
+        "results": results,
+        "refinement": refinement,
+        "meta": dict(idx.meta),
+    }
+
+
+def suggest_chords_profiles(
+    *,
+    chord: str | None = None,
+    progression: Sequence[str] | None = None,
+    key: str,
+    profiles: Mapping[str, Mapping[str, float]],
+    goals: Sequence[str] = ("resolve",),
+    index: str | Path | TISIndex = "tis_index.npz",
+    top: int = 10,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+    flats: bool = False,
+    include_aliases: bool = False,
+    features: Sequence[str] | None = None,
+) -> dict[str, Any]:
+    """Compare weight profiles (e.g. for tuning or A/B tests) on one query.
+
+    ``profiles`` maps a profile name to a weights mapping like ``weights`` of
+    `suggest_chords`. Features are computed once (and kept in a per-index LRU, so
+    repeating the query with new profiles is cheap); every (profile, goal) pair is
+    then ranked from them. Features no profile weights are reported only if listed
+    in ``features``.
+
+    Returns
+    -------
+    dict with keys: query, profiles ({name: {"weights", "goals": {goal: results}}}), meta
+    """
+    idx = load_index(index)
+    key_root, key_mode = parse_key(key)
+    prog_list = list(progression) if progression else None
+    chosen_chord = chord if chord is not None else (prog_list[-1] if prog_list else None)
+    if chosen_chord is None:
+        raise ValueError("Either chord or progression must be provided.")
+    if prog_list and chosen_chord != prog_list[-1]:
+        raise ValueError("chord must match the last chord in progression.")
+
+    ranked = suggest_for_profiles(
         idx,
-        prev_chord=chosen_chord,
-        key_root=key_root,
-        key_mode=key_mode,
+        chosen_chord,
+        key_root,
+        key_mode,
+        profiles=profiles,
+        goals=goals,
         top=top,
-        weights=dict(weights) if weights is not None else None,
-        goal=goal,
         progression=prog_list,
         normalize=normalize,
         voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=features,
     )
-
-    # Post-process notes + aliases for backend convenience.
-    for r in results:
-        row = int(r["row"])
-        if flats:
-            r["notes"] = chroma_bits_to_notes(idx.chroma_bits[row].tolist(), flats=True)
-        if include_aliases:
-            r["aliases"] = idx.aliases_for_row(row)
-        else:
-            r["aliases_count"] = int(idx.alias_offsets[row + 1] - idx.alias_offsets[row])
-        r["representatives_all"] = idx.reps_for_row(row)
-        r["representatives"] = filter_slash_suggestions(r["representatives_all"])
+    for by_goal in ranked.values():
+        for results in by_goal.values():
+            decorate_results(idx, results, flats=flats, include_aliases=include_aliases)
 
     return {
         "query": {
@@ -119,8 +413,234 @@ def suggest_chords(
             "progression": prog_list,
             "key": f"{key_root} {key_mode}",
         },
+        "profiles": {
+            name: {"weights": dict(profiles[name]), "goals": ranked[name]} for name in ranked
+        },
+        "meta": dict(idx.meta),
+    }
+
+
+class BatchSuggestions(Sequence[dict]):
+    """Results of `suggest_chords_batch`: (Q,top) arrays plus lazily built result dicts.
+
+    ``rows``, ``tension`` and ``features[name]`` hold the ranked candidates of every
+    query; indexing yields the same dict shape as `suggest_chords`, built on access.
+    """
+
+    def __init__(
+        self,
+        idx: TISIndex,
+        queries: list[dict[str, Any]],
+        rows: np.ndarray,
+        tension: np.ndarray,
+        features: dict[str, np.ndarray],
+        *,
+        weights: Mapping[str, float] | None,
+        flats: bool,
+        include_aliases: bool,
+    ):
+        self.index = idx
+        self.queries = queries
+        self.rows = rows
+        self.tension = tension
+        self.features = features
+        self._weights = dict(weights) if weights is not None else dict(DEFAULT_WEIGHTS)
+        self._flats = flats
+        self._include_aliases = include_aliases
+        self._results: dict[int, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def __getitem__(self, i: int) -> dict[str, Any]:  # type: ignore[override]
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError(f"Batch index {i} out of range for {len(self)} queries.")
+        if i not in self._results:
+            self._results[i] = self._build(i)
+        return self._results[i]
+
+    def _build(self, i: int) -> dict[str, Any]:
+        rows = self.rows[i]
+        n = self.index.tis.shape[0]
+        # Scatter the kept rows into (M,) arrays for `format_suggestions`.
+        feats = {name: np.full(n, np.nan) for name in self.features}
+        tension = np.full(n, np.nan)
+        for name, vals in self.features.items():
+            feats[name][rows] = vals[i]
+        tension[rows] = self.tension[i]
+        results = format_suggestions(self.index, rows, feats, tension)
+        decorate_results(
+            self.index, results, flats=self._flats, include_aliases=self._include_aliases
+        )
+        query = self.queries[i]
+        return {
+            "query": {
+                "chord": query["chord"],
+                "progression": query["progression"],
+                "key": query["key"],
+            },
+            "goal": query["goal"],
+            "weights": dict(self._weights),
+            "results": results,
+            "meta": dict(self.index.meta),
+        }
+
+
+def suggest_chords_batch(
+    queries: Sequence[Mapping[str, Any] | tuple[str, str]],
+    *,
+    index: str | Path | TISIndex = "tis_index.npz",
+    top: int = 10,
+    goal: str = "resolve",
+    weights: Mapping[str, float] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+    flats: bool = False,
+    include_aliases: bool = False,
+    features: Sequence[str] | None = None,
+) -> BatchSuggestions:
+    """Suggest next chords for many queries at once.
+
+    Each query is a ``(chord, key)`` pair or a mapping with ``key`` and ``chord``
+    and/or ``progression`` (as in `suggest_chords`), optionally overriding ``goal``.
+    Names are resolved together and features are computed as (Q,M) matrices (see
+    `compute_features_batch`); other options, including ``features`` (see
+    `suggest_chords`), are shared by all queries.
+    """
+    idx = load_index(index)
+    normalized: list[dict[str, Any]] = []
+    for q in queries:
+        spec = {"chord": q[0], "key": q[1]} if isinstance(q, tuple) else dict(q)
+        key_root, key_mode = parse_key(spec["key"])
+        prog_list = list(spec["progression"]) if spec.get("progression") else None
+        chosen = spec.get("chord")
+        if prog_list:
+            if chosen is None:
+                chosen = prog_list[-1]
+            elif chosen != prog_list[-1]:
+                raise ValueError("chord must match the last chord in progression.")
+        if chosen is None:
+            raise ValueError("Either chord or progression must be provided.")
+        normalized.append(
+            {
+                "chord": chosen,
+                "progression": prog_list,
+                "key": f"{key_root} {key_mode}",
+                "key_id": key_id(key_root, key_mode),
+                "goal": spec.get("goal", goal),
+            }
+        )
+
+    prev_rows = idx.rows_for_names([q["chord"] for q in normalized])
+    missing = np.flatnonzero(prev_rows < 0)
+    if missing.shape[0]:
+        raise ValueError(f"Chord {normalized[int(missing[0])]['chord']!r} not found in index.")
+    progression_rows = [
+        resolve_query_rows(idx, q["chord"], q["progression"])[1] if q["progression"] else None
+        for q in normalized
+    ]
+
+    feats = compute_features_batch(
+        idx,
+        prev_rows,
+        [q["key_id"] for q in normalized],
+        progression_rows=progression_rows,
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=required_features(weights, features),
+    )
+    rows, tension = rank_candidates_batch(
+        feats,
+        prev_rows,
+        [q["goal"] for q in normalized],
+        top,
+        weights=dict(weights) if weights is not None else None,
+        normalize=normalize,
+        shape=(len(normalized), idx.tis.shape[0]),
+    )
+    kept = {name: np.take_along_axis(vals, rows, axis=1) for name, vals in feats.items()}
+    return BatchSuggestions(
+        idx,
+        normalized,
+        rows,
+        tension,
+        kept,
+        weights=weights,
+        flats=flats,
+        include_aliases=include_aliases,
+    )
+
+
+def plan_progression(
+    *,
+    start: str,
+    key: str,
+    steps: int = 4,
+    beam: int = 8,
+    progression: Sequence[str] | None = None,
+    index: str | Path | TISIndex = "tis_index.npz",
+    goal: str = "resolve",
+    weights: Mapping[str, float] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+) -> dict[str, Any]:
+    """Plan `steps` chords ahead of `start` by beam search (see `beam_search_progressions`).
+
+    ``progression`` (ending in ``start``) is optional context for hierarchical
+    tension, as in `suggest_chords`. Each path is scored by summing its per-step
+    tension under ``goal``. Expansions are fast when the index stores the
+    voice-leading matrix (``build_tis_index(precompute_voice_leading=True)``);
+    otherwise m is computed once per chord reached and kept in a per-index LRU,
+    so replanning from nearby chords is fast.
+
+    Returns
+    -------
+    dict with keys: query, goal, weights, paths (best first; each with rank,
+    rows, chords, tension per step and score), meta
+    """
+    idx = load_index(index)
+    key_root, key_mode = parse_key(key)
+    prog_list = list(progression) if progression else None
+    start_row, progression_rows = resolve_query_rows(idx, start, prog_list)
+
+    paths, tension, score = beam_search_progressions(
+        idx,
+        start_row,
+        key_root,
+        key_mode,
+        steps=steps,
+        beam=beam,
+        weights=dict(weights) if weights is not None else None,
+        goal=goal,
+        progression_rows=progression_rows,
+        normalize=normalize,
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+    )
+    reps = idx.reps_for_rows(np.unique(paths))
+    names = {
+        int(row): (filter_slash_suggestions(r) or [str(idx.rep_names[int(row)])])[0]
+        for row, r in zip(np.unique(paths).tolist(), reps)
+    }
+    return {
+        "query": {
+            "start": start,
+            "progression": prog_list,
+            "key": f"{key_root} {key_mode}",
+            "steps": steps,
+            "beam": beam,
+        },
         "goal": goal,
         "weights": dict(weights) if weights is not None else dict(DEFAULT_WEIGHTS),
-        "results": results,
-        "meta": idx.meta,
+        "paths": [
+            {
+                "rank": i + 1,
+                "rows": path,
+                "chords": [names[r] for r in path],
+                "tension": t,
+                "score": float(sc),
+            }
+            for i, (path, t, sc) in enumerate(zip(paths.tolist(), tension.tolist(), score))
+        ],
+        "meta": dict(idx.meta),
     }
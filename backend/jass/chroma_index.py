@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, Mapping, Sequence
 
 
 CHROMA_LEN = 12
+NUM_MASKS = 1 << CHROMA_LEN
 
 
 class ChromaInputError(ValueError):
@@ -135,6 +136,19 @@ def bitstring_to_mask(bitstring: str) -> int:
 
 _NOTE_NAMES_SHARP_LOWER = ["c", "c#", "d", "d#", "e", "f", "f#", "g", "g#", "a", "a#", "b"]
 _NOTE_NAMES_FLAT_LOWER = ["c", "db", "d", "eb", "e", "f", "gb", "g", "ab", "a", "bb", "b"]
+_ROOT_PCS = {
+    **{n.capitalize(): i for i, n in enumerate(_NOTE_NAMES_SHARP_LOWER)},
+    **{n.capitalize(): i for i, n in enumerate(_NOTE_NAMES_FLAT_LOWER)},
+    "E#": 5,
+    "Fb": 4,
+    "B#": 0,
+    "Cb": 11,
+}
+
+
+def chord_root_pc(name: str) -> int | None:
+    """Pitch class (C=0) of `chord_root(name)`, or None if the name has no root."""
+    return _ROOT_PCS.get(chord_root(name))
 
 
 def chroma_bits_to_notes(bits: Sequence[int], *, flats: bool = False) -> list[str]:
@@ -248,6 +262,28 @@ class ChromaIndexFile:
     meta: dict[str, object]
     reps: dict[int, list[str]]
     aliases: dict[int, list[str]] | None = None
+    _dense: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def _dense_table(self, which: str) -> list[list[str] | None]:
+        """4096-entry list view of `reps`/`aliases` (None = absent), built on first use."""
+        table = self._dense.get(which)
+        if table is None:
+            source = self.reps if which == "reps" else self.aliases or {}
+            table = [None] * NUM_MASKS
+            for mask, names in source.items():
+                table[mask] = names
+            self._dense[which] = table
+        return table
+
+    def reps_for_mask(self, mask: int) -> list[str] | None:
+        if mask < 0 or mask >= NUM_MASKS:
+            raise ChromaInputError(f"Mask must be in [0, {NUM_MASKS}); got {mask}.")
+        return self._dense_table("reps")[mask]
+
+    def aliases_for_mask(self, mask: int) -> list[str] | None:
+        if mask < 0 or mask >= NUM_MASKS:
+            raise ChromaInputError(f"Mask must be in [0, {NUM_MASKS}); got {mask}.")
+        return self._dense_table("aliases")[mask]
 
     def _key_format(self) -> str:
         key = str(self.meta.get("key", "mask12"))
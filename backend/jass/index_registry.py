@@ -0,0 +1,98 @@
+"""Process-wide registry of loaded TIS indexes.
+
+Loading ``tis_index.npz`` decompresses and parses the whole file, so the library
+API keeps loaded indexes here, keyed by resolved path + mtime and by content
+hash, and shares one read-only `TISIndex` per distinct file. Directory layouts
+(`TISIndex.to_npy_dir`) are memory-mapped, so their pages are also shared
+between processes.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+
+from .lru import CacheInfo, LRUCache
+from .string_table import StringTable
+from .tis_index import NPY_DIR_META, TISIndex
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dir_digest(path: Path) -> str:
+    # Hash meta + file stats only: reading every array would defeat memory-mapping.
+    h = hashlib.blake2b(digest_size=16)
+    h.update((path / NPY_DIR_META).read_bytes())
+    for file in sorted(path.glob("*.npy")):
+        st = file.stat()
+        h.update(f"{file.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+def _stat_key(path: Path) -> tuple[str, int, int]:
+    # For a directory layout, meta.json is rewritten last by `TISIndex.to_npy_dir`.
+    st = (path / NPY_DIR_META).stat() if path.is_dir() else path.stat()
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _freeze(index: TISIndex) -> TISIndex:
+    """Mark every array of a shared index read-only, and its meta (lists become tuples)."""
+    for f in dataclasses.fields(index):
+        value = getattr(index, f.name)
+        if isinstance(value, (np.ndarray, StringTable)):
+            value.setflags(write=False)
+    meta = {k: tuple(v) if isinstance(v, list) else v for k, v in index.meta.items()}
+    return dataclasses.replace(index, meta=MappingProxyType(meta))
+
+
+class IndexRegistry:
+    """LRU of loaded indexes shared across callers of the library API.
+
+    A stat of the resolved path (mtime + size) maps to the file's content hash;
+    the hash maps to the loaded index. Rewriting a file therefore reloads it,
+    while identical files at different paths share one instance.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self._indexes: LRUCache[TISIndex] = LRUCache(maxsize)
+        self._digests: dict[tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str | Path) -> TISIndex:
+        resolved = Path(path).resolve()
+        stat_key = _stat_key(resolved)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+            if digest is None:
+                digest = _dir_digest(resolved) if resolved.is_dir() else _file_digest(resolved)
+                # Drop stale stat entries for this path (file was rewritten).
+                for k in [k for k in self._digests if k[0] == stat_key[0]]:
+                    del self._digests[k]
+                self._digests[stat_key] = digest
+            index = self._indexes.get(digest)
+            if index is None:
+                index = _freeze(TISIndex.load(resolved))
+                self._indexes.put(digest, index)
+            return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._digests.clear()
+
+    def info(self) -> CacheInfo:
+        return self._indexes.info()
+
+
+INDEX_REGISTRY = IndexRegistry()
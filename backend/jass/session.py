@@ -0,0 +1,142 @@
+"""Stateful chord suggestion for live play.
+
+`SuggestionSession` binds an index and a key once: the name lookup, key parse,
+per-key feature tables and the hierarchical progression tree are all reused, so
+each "chord played -> suggestions" event costs only the per-chord work.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Mapping, Sequence
+
+from .chord_suggestion import decorate_results, load_index
+from .tis_index import TISIndex
+from .tonal_tension import DEFAULT_WEIGHTS, parse_key
+from .tonal_tension.features import compute_features
+from .tonal_tension.key_features import key_features
+from .tonal_tension.model import format_suggestions, rank_candidates, required_features
+from .tonal_tension.progression import ProgressionTree
+
+
+class SuggestionSession:
+    """Chord suggestions for a progression that grows one played chord at a time.
+
+    Chords may be given as names/aliases or as index row ids.
+
+    Example::
+
+        session = SuggestionSession(key="C")
+        session.play("C")
+        out = session.play("G7")  # suggestions after C -> G7
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str,
+        index: str | Path | TISIndex = "tis_index.npz",
+        top: int = 10,
+        goal: str = "resolve",
+        weights: Mapping[str, float] | None = None,
+        normalize: bool = True,
+        voice_leading_addition_penalty: int = 4,
+        flats: bool = False,
+        include_aliases: bool = False,
+        window: int | None = None,
+        features: Sequence[str] | None = None,
+    ):
+        self.index = load_index(index)
+        self.key_root, self.key_mode = parse_key(key)
+        self.top = top
+        self.goal = goal
+        self.weights = dict(weights) if weights is not None else None
+        self.normalize = normalize
+        self.voice_leading_addition_penalty = voice_leading_addition_penalty
+        self.flats = flats
+        self.include_aliases = include_aliases
+        self.features = required_features(self.weights, features)
+        self.tree = ProgressionTree(self.index, self.key_root, self.key_mode, window=window)
+        # Warm the per-key tables so the first event does not pay for them.
+        key_features(self.index, self.key_root, self.key_mode)
+
+    @property
+    def key(self) -> str:
+        return f"{self.key_root} {self.key_mode}"
+
+    @property
+    def progression(self) -> list[str]:
+        """Representative names of the chords currently in context."""
+        return self.index.names_for_rows(self.tree.rows)
+
+    def resolve(self, chord: str | int) -> int:
+        """Index row for a chord name/alias or row id."""
+        if isinstance(chord, str):
+            row = self.index.row_for_name(chord)
+            if row is None:
+                raise ValueError(f"Chord {chord!r} not found in index.")
+            return row
+        row = int(chord)
+        if row < 0 or row >= self.index.tis.shape[0]:
+            raise ValueError(f"Row {row} out of range for index.")
+        return row
+
+    def reset(self) -> None:
+        self.tree.clear()
+
+    def play(self, chord: str | int, **overrides: Any) -> dict[str, Any]:
+        """Append a played chord and return suggestions for what follows it."""
+        self.tree.append(self.resolve(chord))
+        return self.suggest(**overrides)
+
+    def suggest(
+        self,
+        chord: str | int | None = None,
+        *,
+        top: int | None = None,
+        goal: str | None = None,
+    ) -> dict[str, Any]:
+        """Suggestions after the current progression, or after `chord` without context."""
+        if chord is not None:
+            prev_row = self.resolve(chord)
+            tree = None
+        elif len(self.tree):
+            prev_row = int(self.tree.last_row)
+            tree = self.tree
+        else:
+            raise ValueError("No chord played yet; pass chord= or call play() first.")
+
+        goal = self.goal if goal is None else goal
+        top = self.top if top is None else top
+        feats = compute_features(
+            self.index,
+            prev_row,
+            self.key_root,
+            self.key_mode,
+            progression_tree=tree,
+            voice_leading_addition_penalty=self.voice_leading_addition_penalty,
+            features=self.features,
+        )
+        order, tension = rank_candidates(
+            feats,
+            prev_row,
+            weights=self.weights,
+            goal=goal,
+            normalize=self.normalize,
+            size=self.index.tis.shape[0],
+        )
+        results = format_suggestions(self.index, order[:top], feats, tension)
+        decorate_results(
+            self.index, results, flats=self.flats, include_aliases=self.include_aliases
+        )
+        return {
+            "query": {
+                "chord": chord if isinstance(chord, str) else str(self.index.rep_names[prev_row]),
+                "progression": self.progression if tree is not None else None,
+                "key": self.key,
+            },
+            "goal": goal,
+            "weights": dict(self.weights) if self.weights is not None else dict(DEFAULT_WEIGHTS),
+            "results": results,
+            "meta": dict(self.index.meta),
+        }
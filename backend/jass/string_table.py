@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence, overload
+
+import numpy as np
+
+
+@dataclass(frozen=True, eq=False)
+class StringTable:
+    """Packed UTF-8 string column: one byte blob plus (K+1,) offsets, decoded lazily.
+
+    Replaces fixed-width ``<U64`` arrays (256 bytes per name) for the index name
+    tables; string ``i`` is ``data[offsets[i]:offsets[i + 1]]``.
+    """
+
+    data: np.ndarray  # (B,) uint8; concatenated UTF-8 bytes
+    offsets: np.ndarray  # (K+1,) int32; byte offsets into data
+
+    @staticmethod
+    def from_strings(strings: Iterable[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        if offsets[-1] > np.iinfo(np.int32).max:
+            raise ValueError("StringTable exceeds 2 GiB of UTF-8 data.")
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        return StringTable(data=data, offsets=offsets.astype(np.int32))
+
+    @staticmethod
+    def from_array(values: np.ndarray | Sequence[str]) -> "StringTable":
+        """Convert a legacy fixed-width string array."""
+        return StringTable.from_strings(str(x) for x in np.asarray(values).tolist())
+
+    def __len__(self) -> int:
+        return int(self.offsets.shape[0]) - 1
+
+    @property
+    def shape(self) -> tuple[int]:
+        return (len(self),)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + self.offsets.nbytes)
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+    @overload
+    def __getitem__(self, i: slice) -> list[str]: ...
+    def __getitem__(self, i: int | slice) -> str | list[str]:
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            return self.slice(start, stop)
+        n = len(self)
+        i = int(i)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError(f"StringTable index {i} out of range for length {n}.")
+        return self.data[self.offsets[i] : self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.slice(0, len(self)))
+
+    def slice(self, start: int, end: int) -> list[str]:
+        """Decode strings ``start..end-1`` from one contiguous byte range."""
+        if end <= start:
+            return []
+        offs = self.offsets[start : end + 1].tolist()
+        base = offs[0]
+        blob = self.data[base : offs[-1]].tobytes()
+        return [blob[a - base : b - base].decode("utf-8") for a, b in zip(offs[:-1], offs[1:])]
+
+    def take(self, rows: Iterable[int]) -> list[str]:
+        """Decode the strings at many positions at once."""
+        return [self[int(i)] for i in rows]
+
+    def tolist(self) -> list[str]:
+        return self.slice(0, len(self))
+
+    def setflags(self, *, write: bool) -> None:
+        self.data.setflags(write=write)
+        self.offsets.setflags(write=write)
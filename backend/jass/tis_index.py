@@ -1,22 +1,35 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Mapping, Sequence
+from typing import IO, Any, Callable, Hashable, Iterator, Mapping, Sequence, TypeVar
 
 import numpy as np
 
 from .chroma_index import (
     CHROMA_LEN,
+    NUM_MASKS,
     ChromaInputError,
     bits_to_mask,
     choose_representatives_by_root,
     choose_representative,
+    chord_root_pc,
+    filter_slash_suggestions,
+    mask_to_bitstring,
 )
+from .string_table import StringTable
 
 
+_T = TypeVar("_T")
+
+NPY_DIR_META = "meta.json"
+
 TIS_DIM = CHROMA_LEN // 2
 DEFAULT_WEIGHTS = np.array([2, 11, 17, 16, 19, 7], dtype=np.float64)
 DEFAULT_BIT_ORDER = np.array(
@@ -113,108 +126,591 @@ def chroma_bits_to_tis(bits: Sequence[int], *, weights: np.ndarray = DEFAULT_WEI
     return chroma_matrix_to_tis(arr, weights=weights)[0]
 
 
+_REQUIRED_ARRAYS = (
+    "rep_names",
+    "chroma_bits",
+    "chroma_mask",
+    "tis",
+    "tis_norm",
+    "tis_unit",
+    "rep_offsets",
+    "rep_names_by_root",
+    "alias_offsets",
+    "alias_names",
+)
+# Optional derived tables; stored only when present and loaded when found.
+_OPTIONAL_ARRAYS = (
+    "voice_leading",
+    "key_d2",
+    "key_d3",
+    "key_function",
+    "name_keys",
+    "name_rows",
+    "mask_table",
+    "nearest_table",
+    "transpose_table",
+    "class_id",
+    "class_offset",
+    "class_masks",
+    "closure_masks",
+    "voice_leading_classes",
+    "note_count",
+    "root_mask",
+    "slash_only",
+)
+# Every array file name a `to_npy_dir` layout may hold, including string
+# columns stored as UTF-8 data + offsets and the legacy per-name ``names``.
+_NPY_DIR_FILES = frozenset(
+    f"{name}{suffix}"
+    for name in _REQUIRED_ARRAYS + _OPTIONAL_ARRAYS + ("names",)
+    for suffix in ("", "_utf8", "_utf8_offsets")
+)
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "wb", **kwargs: Any) -> Iterator[IO[Any]]:
+    """Open a temporary file next to `path` that replaces `path` once fully written.
+
+    Readers never see a partly written file, and processes that memory-mapped the
+    old file keep its (unchanged) inode. The file is discarded on error.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(tmp, stat.S_IMODE(path.stat().st_mode) if path.exists() else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def chroma_matrix_to_masks(chroma_bits: np.ndarray | Sequence[Sequence[int]]) -> np.ndarray:
+    """Vectorized `bits_to_mask` for an (N,12) 0/1 matrix -> (N,) int64 masks."""
+    bits = np.asarray(chroma_bits)
+    if bits.ndim != 2 or bits.shape[1] != CHROMA_LEN:
+        raise ChromaInputError(f"Expected an (N,{CHROMA_LEN}) chroma matrix; got {bits.shape}.")
+    if np.any((bits != 0) & (bits != 1)):
+        raise ChromaInputError("Chroma bits must be 0/1.")
+    return bits.astype(np.int64) @ (1 << np.arange(CHROMA_LEN, dtype=np.int64))
+
+
+def build_mask_table(chroma_mask: np.ndarray) -> np.ndarray:
+    """Dense (4096,) int32 mask -> row table (-1 = no row) for a sorted `chroma_mask` column."""
+    table = np.full(NUM_MASKS, -1, dtype=np.int32)
+    table[np.asarray(chroma_mask, dtype=np.int64)] = np.arange(len(chroma_mask), dtype=np.int32)
+    return table
+
+
+def _popcount_table() -> np.ndarray:
+    counts = np.zeros(NUM_MASKS, dtype=np.int8)
+    for bit in range(CHROMA_LEN):
+        counts += (np.arange(NUM_MASKS) >> bit) & 1
+    return counts
+
+
+def build_row_columns(
+    chroma_mask: np.ndarray,
+    alias_names: StringTable,
+    alias_offsets: np.ndarray,
+    rep_names_by_root: StringTable,
+    rep_offsets: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Per-row columns for candidate constraints (see `jass.tonal_tension.constraints`).
+
+    ``note_count`` is the number of pitch classes, ``root_mask`` has bit p set if
+    a displayed representative (per-root reps after `filter_slash_suggestions`)
+    has root pitch class p, and ``slash_only`` marks rows whose every alias is a
+    slash chord.
+    """
+    masks = np.asarray(chroma_mask, dtype=np.int64)
+    names = alias_names.tolist()
+    offsets = np.asarray(alias_offsets).tolist()
+    reps = rep_names_by_root.tolist()
+    rep_bounds = np.asarray(rep_offsets).tolist()
+    root_mask = np.zeros(masks.shape[0], dtype=np.uint16)
+    slash_only = np.zeros(masks.shape[0], dtype=bool)
+    for i in range(masks.shape[0]):
+        bits = 0
+        for name in filter_slash_suggestions(reps[rep_bounds[i] : rep_bounds[i + 1]]):
+            pc = chord_root_pc(name)
+            if pc is not None:
+                bits |= 1 << pc
+        root_mask[i] = bits
+        row_names = names[offsets[i] : offsets[i + 1]]
+        slash_only[i] = bool(row_names) and all("/" in name for name in row_names)
+    return {
+        "note_count": _popcount_table()[masks],
+        "root_mask": root_mask,
+        "slash_only": slash_only,
+    }
+
+
+def build_nearest_table(
+    chroma_mask: np.ndarray,
+    tis: np.ndarray,
+    *,
+    weights: np.ndarray = DEFAULT_WEIGHTS,
+    chunk: int = 512,
+) -> np.ndarray:
+    """
+    Nearest indexed row for every 12-bit chroma mask, as a (4096,) int32 table.
+
+    Rows are ranked by Hamming distance between masks (notes added or dropped),
+    ties broken by Euclidean TIS distance, then by lowest row. Masks already in
+    the index map to their own row; the empty mask 0 maps to -1.
+    """
+    index_masks = np.asarray(chroma_mask, dtype=np.int64)
+    table = np.full(NUM_MASKS, -1, dtype=np.int32)
+    if index_masks.shape[0] == 0:
+        return table
+    popcount = _popcount_table()
+    all_masks = np.arange(1, NUM_MASKS, dtype=np.int64)
+    bits = (all_masks[:, None] >> np.arange(CHROMA_LEN)) & 1
+    all_tis = chroma_matrix_to_tis(bits.astype(np.float64), weights=weights)
+    tis = np.asarray(tis)
+    for lo in range(0, all_masks.shape[0], chunk):
+        masks = all_masks[lo : lo + chunk]
+        hamming = popcount[masks[:, None] ^ index_masks[None, :]]
+        nearest = hamming == hamming.min(axis=1, keepdims=True)
+        diff = all_tis[lo : lo + chunk, None, :] - tis[None, :, :]
+        dist = np.sqrt(np.sum(np.abs(diff) ** 2, axis=2))
+        dist[~nearest] = np.inf
+        table[masks] = np.argmin(dist, axis=1)
+    return table
+
+
+# Key ids (see `jass.tonal_tension.key_features.key_id`) kept by compact key tables.
+COMPACT_KEY_IDS = (0, 12)  # C major, C minor
+
+
+def rotate_masks(masks: Sequence[int] | np.ndarray, semitones: int) -> np.ndarray:
+    """Transpose 12-bit chroma masks up by `semitones` (a circular bit rotation)."""
+    k = semitones % CHROMA_LEN
+    masks_arr = np.asarray(masks, dtype=np.int64)
+    return ((masks_arr << k) | (masks_arr >> (CHROMA_LEN - k))) & (NUM_MASKS - 1)
+
+
+def build_transposition_tables(chroma_mask: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Transposition structure of the rows of an index.
+
+    Returns ``transpose_table`` (M,12): the row of each chord transposed up k
+    semitones (-1 if not indexed); ``class_id`` (M,): dense id of the row's
+    transposition class, whose canonical form ``class_masks`` (C,) is its smallest
+    rotated mask; ``class_offset`` (M,): semitones from the canonical form up to
+    the row (smallest if symmetric); and ``closure_masks``: every transposition of
+    every class, sorted. The index need not be closed under transposition.
+    """
+    masks = np.asarray(chroma_mask, dtype=np.int64)
+    mask_table = build_mask_table(masks)
+    rotated = np.stack([rotate_masks(masks, k) for k in range(CHROMA_LEN)], axis=1)
+    canonical = rotated.min(axis=1)
+    from_canonical = np.stack([rotate_masks(canonical, k) for k in range(CHROMA_LEN)], axis=1)
+    class_masks, class_id = np.unique(canonical, return_inverse=True)
+    return {
+        "transpose_table": mask_table[rotated],
+        "class_id": class_id.astype(np.int32).ravel(),
+        "class_offset": np.argmax(from_canonical == masks[:, None], axis=1).astype(np.int8),
+        "class_masks": class_masks.astype(np.uint16),
+        "closure_masks": np.unique(rotated).astype(np.uint16),
+    }
+
+
+def _group_slices(
+    table: StringTable, offsets: np.ndarray, rows: Sequence[int] | np.ndarray
+) -> list[list[str]]:
+    rows_arr = np.asarray(rows, dtype=np.int64).ravel()
+    starts = np.asarray(offsets)[rows_arr].tolist()
+    ends = np.asarray(offsets)[rows_arr + 1].tolist()
+    return [table.slice(a, b) for a, b in zip(starts, ends)]
+
+
 @dataclass(frozen=True)
 class TISIndex:
-    rep_names: np.ndarray  # (M,) dtype str; primary representative per unique chroma mask
+    rep_names: StringTable  # (M,) primary representative per unique chroma mask
     chroma_bits: np.ndarray  # (M,12) uint8; chroma for representative
     chroma_mask: np.ndarray  # (M,) uint16/uint32; unique chroma masks
     tis: np.ndarray  # (M,6) complex128; TIS for representative
     tis_norm: np.ndarray  # (M,) float64
     tis_unit: np.ndarray  # (M,6) complex128
     rep_offsets: np.ndarray  # (M+1,) int32; slice offsets into rep_names_by_root
-    rep_names_by_root: np.ndarray  # (R,) dtype str; flattened per-root canonical reps
+    rep_names_by_root: StringTable  # (R,) flattened per-root canonical reps
     alias_offsets: np.ndarray  # (M+1,) int32; slice offsets into alias_names
-    alias_names: np.ndarray  # (K,) dtype str; flattened aliases (includes representative)
+    alias_names: StringTable  # (K,) flattened aliases (includes representative)
     meta: Mapping[str, object]
+    voice_leading: np.ndarray | None = None  # (M,M) float32; optional pairwise voice-leading m
+    key_d2: np.ndarray | None = None  # (24,M) float64; optional per-key angle to the key
+    key_d3: np.ndarray | None = None  # (24,M) float64; optional per-key angle to prototypes
+    key_function: np.ndarray | None = None  # (24,M) int8; optional per-key t/s/d label codes
+    name_keys: np.ndarray | None = None  # (K,) bytes; sorted UTF-8 alias names
+    name_rows: np.ndarray | None = None  # (K,) int32; row for each entry of name_keys
+    mask_table: np.ndarray | None = None  # (4096,) int32; row per 12-bit chroma mask, -1 if absent
+    nearest_table: np.ndarray | None = None  # (4096,) int32; closest row per mask, -1 for mask 0
+    transpose_table: np.ndarray | None = None  # (M,12) int32; row transposed up k semitones
+    class_id: np.ndarray | None = None  # (M,) int32; transposition class of each row
+    class_offset: np.ndarray | None = None  # (M,) int8; semitones above its class row
+    class_masks: np.ndarray | None = None  # (C,) uint16; canonical mask of each class
+    closure_masks: np.ndarray | None = None  # (N,) uint16; sorted masks of all transpositions
+    voice_leading_classes: np.ndarray | None = None  # (C,N) float32; class -> closure mask m
+    note_count: np.ndarray | None = None  # (M,) int8; pitch classes per row
+    root_mask: np.ndarray | None = None  # (M,) uint16; bit p set if a displayed rep has root p
+    slash_only: np.ndarray | None = None  # (M,) bool; every alias is a slash chord
+    _memo: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def memo(self, key: Hashable, build: Callable[[], _T]) -> _T:
+        """Return a lazily built, process-local derived value cached on this index."""
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
 
     def reps_for_row(self, row: int) -> list[str]:
         start = int(self.rep_offsets[row])
         end = int(self.rep_offsets[row + 1])
-        return [str(x) for x in self.rep_names_by_root[start:end].tolist()]
+        return self.rep_names_by_root.slice(start, end)
 
     def aliases_for_row(self, row: int) -> list[str]:
         start = int(self.alias_offsets[row])
         end = int(self.alias_offsets[row + 1])
-        return [str(x) for x in self.alias_names[start:end].tolist()]
+        return self.alias_names.slice(start, end)
+
+    def names_for_rows(self, rows: Sequence[int] | np.ndarray) -> list[str]:
+        """Primary representative names for many rows at once."""
+        return self.rep_names.take(np.asarray(rows, dtype=np.int64).ravel().tolist())
+
+    def reps_for_rows(self, rows: Sequence[int] | np.ndarray) -> list[list[str]]:
+        return _group_slices(self.rep_names_by_root, self.rep_offsets, rows)
+
+    def aliases_for_rows(self, rows: Sequence[int] | np.ndarray) -> list[list[str]]:
+        return _group_slices(self.alias_names, self.alias_offsets, rows)
 
     def build_name_to_row(self) -> dict[str, int]:
         name_to_row: dict[str, int] = {}
-        for i in range(int(self.rep_names.shape[0])):
-            for name in self.aliases_for_row(i):
+        names = self.alias_names.tolist()
+        offsets = self.alias_offsets.tolist()
+        for i in range(len(self.rep_names)):
+            for name in names[offsets[i] : offsets[i + 1]]:
                 name_to_row[name] = i
         return name_to_row
 
+    def _name_lookup(self) -> tuple[np.ndarray, np.ndarray]:
+        if self.name_keys is not None and self.name_rows is not None:
+            return self.name_keys, self.name_rows
+        # Indexes built before the sorted name index was stored: build it once.
+        return self.memo(
+            "name_lookup",
+            lambda: build_name_lookup(self.alias_names, self.alias_offsets),
+        )
+
+    def rows_for_names(self, names: Sequence[str]) -> np.ndarray:
+        """Vectorized name/alias -> row resolution via binary search; -1 where absent."""
+        keys, rows = self._name_lookup()
+        out = np.full(len(names), -1, dtype=np.int64)
+        if not len(names) or not keys.shape[0]:
+            return out
+        queries = np.array([str(n).encode("utf-8") for n in names], dtype=np.bytes_)
+        pos = np.searchsorted(keys, queries)
+        inside = pos < keys.shape[0]
+        hit = np.zeros(len(names), dtype=bool)
+        hit[inside] = keys[pos[inside]] == queries[inside]
+        out[hit] = rows[pos[hit]]
+        return out
+
+    def row_for_name(self, name: str) -> int | None:
+        """Row for a chord name or alias (None if absent), in O(log K)."""
+        row = int(self.rows_for_names([name])[0])
+        return row if row >= 0 else None
+
     def build_mask_to_row(self) -> dict[int, int]:
         return {int(m): i for i, m in enumerate(self.chroma_mask.tolist())}
 
-    def to_npz(self, path: Path) -> None:
-        meta_json = json.dumps(dict(self.meta), ensure_ascii=False, sort_keys=True)
-        np.savez_compressed(
-            path,
-            rep_names=self.rep_names,
-            chroma_bits=self.chroma_bits,
-            chroma_mask=self.chroma_mask,
-            tis=self.tis,
-            tis_norm=self.tis_norm,
-            tis_unit=self.tis_unit,
-            rep_offsets=self.rep_offsets,
-            rep_names_by_root=self.rep_names_by_root,
-            alias_offsets=self.alias_offsets,
-            alias_names=self.alias_names,
-            meta_json=np.array(meta_json),
+    def _mask_table(self) -> np.ndarray:
+        if self.mask_table is not None:
+            return self.mask_table
+        return self.memo("mask_table", lambda: build_mask_table(self.chroma_mask))
+
+    def rows_for_masks(self, masks: Sequence[int] | np.ndarray) -> np.ndarray:
+        """Rows for many 12-bit chroma masks by one gather; -1 where absent."""
+        masks_arr = np.asarray(masks, dtype=np.int64)
+        if np.any((masks_arr < 0) | (masks_arr >= NUM_MASKS)):
+            raise ChromaInputError(f"Masks must be in [0, {NUM_MASKS}).")
+        return self._mask_table()[masks_arr].astype(np.int64)
+
+    def row_for_mask(self, mask: int) -> int | None:
+        if mask < 0 or mask >= NUM_MASKS:
+            raise ChromaInputError(f"Mask must be in [0, {NUM_MASKS}); got {mask}.")
+        row = int(self._mask_table()[mask])
+        return row if row >= 0 else None
+
+    def rows_for_chroma(self, chroma_bits: np.ndarray | Sequence[Sequence[int]]) -> np.ndarray:
+        """Rows for an (N,12) 0/1 chroma matrix (e.g. detector frames); -1 where absent."""
+        return self.rows_for_masks(chroma_matrix_to_masks(chroma_bits))
+
+    def _nearest_table(self) -> np.ndarray:
+        if self.nearest_table is not None:
+            return self.nearest_table
+        weights = np.asarray(self.meta.get("weights", DEFAULT_WEIGHTS), dtype=np.float64)
+        return self.memo(
+            "nearest_table",
+            lambda: build_nearest_table(self.chroma_mask, self.tis, weights=weights),
         )
 
-    @staticmethod
-    def from_npz(path: Path) -> "TISIndex":
-        with np.load(path, allow_pickle=False) as z:
-            meta_json = str(z["meta_json"].tolist())
-            meta = json.loads(meta_json)
-            if "rep_names" in z:
-                rep_offsets = z["rep_offsets"] if "rep_offsets" in z else None
-                rep_names_by_root = z["rep_names_by_root"] if "rep_names_by_root" in z else None
-                if rep_offsets is None or rep_names_by_root is None:
-                    # Older deduped files without per-root reps: treat primary rep as the only rep.
-                    m = int(z["rep_names"].shape[0])
-                    rep_offsets = np.arange(0, m + 1, dtype=np.int32)
-                    rep_names_by_root = z["rep_names"]
-                return TISIndex(
-                    rep_names=z["rep_names"],
-                    chroma_bits=z["chroma_bits"],
-                    chroma_mask=z["chroma_mask"],
-                    tis=z["tis"],
-                    tis_norm=z["tis_norm"],
-                    tis_unit=z["tis_unit"],
-                    rep_offsets=rep_offsets,
-                    rep_names_by_root=rep_names_by_root,
-                    alias_offsets=z["alias_offsets"],
-                    alias_names=z["alias_names"],
-                    meta=meta,
-                )
-
-            # Backward compatibility for older files that stored one row per chord name.
-            names = z["names"]
-            chroma_bits = z["chroma_bits"]
-            chroma_mask = z["chroma_mask"]
-            tis = z["tis"]
-            tis_norm = z["tis_norm"]
-            tis_unit = z["tis_unit"]
-            n = int(names.shape[0])
-            alias_offsets = np.arange(0, n + 1, dtype=np.int32)
-            rep_offsets = np.arange(0, n + 1, dtype=np.int32)
+    def nearest_rows_for_masks(self, masks: Sequence[int] | np.ndarray) -> np.ndarray:
+        """Closest indexed row for any 12-bit masks (see `build_nearest_table`); -1 for mask 0."""
+        masks_arr = np.asarray(masks, dtype=np.int64)
+        if np.any((masks_arr < 0) | (masks_arr >= NUM_MASKS)):
+            raise ChromaInputError(f"Masks must be in [0, {NUM_MASKS}).")
+        return self._nearest_table()[masks_arr].astype(np.int64)
+
+    def nearest_row_for_mask(self, mask: int) -> int | None:
+        row = int(self.nearest_rows_for_masks([mask])[0])
+        return row if row >= 0 else None
+
+    def row_columns(self) -> dict[str, np.ndarray]:
+        """Stored or lazily built `build_row_columns` arrays for this index."""
+        names = ("note_count", "root_mask", "slash_only")
+        if all(getattr(self, name) is not None for name in names):
+            return {name: getattr(self, name) for name in names}
+        return self.memo(
+            "row_columns",
+            lambda: build_row_columns(
+                self.chroma_mask,
+                self.alias_names,
+                self.alias_offsets,
+                self.rep_names_by_root,
+                self.rep_offsets,
+            ),
+        )
+
+    def transpositions(self) -> dict[str, np.ndarray]:
+        """Stored or lazily built `build_transposition_tables` arrays for this index."""
+        names = ("transpose_table", "class_id", "class_offset", "class_masks", "closure_masks")
+        if all(getattr(self, name) is not None for name in names):
+            return {name: getattr(self, name) for name in names}
+        return self.memo("transpositions", lambda: build_transposition_tables(self.chroma_mask))
+
+    def transpose(self, rows: Sequence[int] | np.ndarray, semitones: int) -> np.ndarray:
+        """Rows transposed up by `semitones`; -1 where the transposed chord is not indexed."""
+        table = self.transpositions()["transpose_table"]
+        return table[np.asarray(rows, dtype=np.int64), semitones % CHROMA_LEN].astype(np.int64)
+
+    def closure_columns(self, semitones: int) -> np.ndarray:
+        """(M,) position in `closure_masks` of every row transposed up by `semitones`.
+
+        Transposition-compact tables (`build_tis_index(compact_transpositions=True)`)
+        are stored over the closure masks and gathered through these columns.
+        Memoized per shift (read-only).
+        """
+        shift = int(semitones) % CHROMA_LEN
+
+        def build() -> np.ndarray:
+            closure = self.transpositions()["closure_masks"]
+            cols = np.searchsorted(closure, rotate_masks(self.chroma_mask, shift))
+            cols.setflags(write=False)
+            return cols
+
+        return self.memo(("closure_columns", shift), build)
+
+    def transposition_closure(self) -> "TISIndex":
+        """Feature-only index whose rows are `closure_masks` (names are bitstrings).
+
+        Every row of this index, transposed by any interval, is a row of the
+        closure, so key-relative work can be done once with the tonic on C and
+        gathered back through `closure_columns`. Compact transposition tables are
+        shared; a full voice-leading matrix is not (it only covers indexed rows).
+        """
+
+        def build() -> TISIndex:
+            tables = self.transpositions()
+            masks = np.asarray(tables["closure_masks"], dtype=np.int64)
+            bits = ((masks[:, None] >> np.arange(CHROMA_LEN)) & 1).astype(np.uint8)
+            weights = np.asarray(self.meta.get("weights", DEFAULT_WEIGHTS), dtype=np.float64)
+            tis = chroma_matrix_to_tis(bits, weights=weights)
+            tis_norm = np.sqrt(np.sum(np.abs(tis) ** 2, axis=1))
+            names = StringTable.from_strings(mask_to_bitstring(m) for m in masks.tolist())
+            offsets = np.arange(len(names) + 1, dtype=np.int32)
+            meta = {
+                "weights": [float(x) for x in weights.tolist()],
+                "transposition_closure_of": self.meta.get("num_vectors", len(self.rep_names)),
+            }
+            if "voice_leading_addition_penalty" in self.meta:
+                meta["voice_leading_addition_penalty"] = self.meta["voice_leading_addition_penalty"]
+            compact_keys = self.key_d2 is not None and self.key_d2.shape[0] == len(COMPACT_KEY_IDS)
             return TISIndex(
                 rep_names=names,
-                chroma_bits=chroma_bits,
-                chroma_mask=chroma_mask,
+                chroma_bits=bits,
+                chroma_mask=masks.astype(np.uint16),
                 tis=tis,
                 tis_norm=tis_norm,
-                tis_unit=tis_unit,
-                rep_offsets=rep_offsets,
+                tis_unit=tis / tis_norm[:, None],
+                rep_offsets=offsets,
                 rep_names_by_root=names,
-                alias_offsets=alias_offsets,
+                alias_offsets=offsets,
                 alias_names=names,
                 meta=meta,
+                key_d2=self.key_d2 if compact_keys else None,
+                key_d3=self.key_d3 if compact_keys else None,
+                key_function=self.key_function if compact_keys else None,
+                voice_leading_classes=self.voice_leading_classes,
+                **build_transposition_tables(masks),
+            )
+
+        return self.memo("transposition_closure", build)
+
+    def _storage_arrays(self) -> dict[str, np.ndarray]:
+        """Flat name -> array mapping written by `to_npz` / `to_npy_dir`."""
+        out: dict[str, np.ndarray] = {}
+        for name in _REQUIRED_ARRAYS + _OPTIONAL_ARRAYS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if isinstance(value, StringTable):
+                out[f"{name}_utf8"] = value.data
+                out[f"{name}_utf8_offsets"] = value.offsets
+            else:
+                out[name] = value
+        return out
+
+    @staticmethod
+    def _from_arrays(arrays: Mapping[str, np.ndarray], meta: Mapping[str, object]) -> "TISIndex":
+        """Inverse of `_storage_arrays`, accepting every older on-disk variant."""
+
+        def strings(name: str) -> StringTable | None:
+            if f"{name}_utf8" in arrays:
+                return StringTable(arrays[f"{name}_utf8"], arrays[f"{name}_utf8_offsets"])
+            if name in arrays:
+                # Older files stored fixed-width <U64 arrays.
+                return StringTable.from_array(arrays[name])
+            return None
+
+        rep_names = strings("rep_names")
+        if rep_names is not None:
+            rep_offsets = arrays.get("rep_offsets")
+            rep_names_by_root = strings("rep_names_by_root")
+            if rep_offsets is None or rep_names_by_root is None:
+                # Older deduped files without per-root reps: treat primary rep as the only rep.
+                m = len(rep_names)
+                rep_offsets = np.arange(0, m + 1, dtype=np.int32)
+                rep_names_by_root = rep_names
+            return TISIndex(
+                rep_names=rep_names,
+                chroma_bits=arrays["chroma_bits"],
+                chroma_mask=arrays["chroma_mask"],
+                tis=arrays["tis"],
+                tis_norm=arrays["tis_norm"],
+                tis_unit=arrays["tis_unit"],
+                rep_offsets=rep_offsets,
+                rep_names_by_root=rep_names_by_root,
+                alias_offsets=arrays["alias_offsets"],
+                alias_names=strings("alias_names"),
+                meta=meta,
+                **{name: arrays[name] for name in _OPTIONAL_ARRAYS if name in arrays},
             )
 
+        # Backward compatibility for older files that stored one row per chord name.
+        names = strings("names")
+        if names is None:
+            raise ValueError("Index data has neither 'rep_names' nor legacy 'names'.")
+        n = len(names)
+        alias_offsets = np.arange(0, n + 1, dtype=np.int32)
+        rep_offsets = np.arange(0, n + 1, dtype=np.int32)
+        return TISIndex(
+            rep_names=names,
+            chroma_bits=arrays["chroma_bits"],
+            chroma_mask=arrays["chroma_mask"],
+            tis=arrays["tis"],
+            tis_norm=arrays["tis_norm"],
+            tis_unit=arrays["tis_unit"],
+            rep_offsets=rep_offsets,
+            rep_names_by_root=names,
+            alias_offsets=alias_offsets,
+            alias_names=names,
+            meta=meta,
+        )
+
+    def to_npz(self, path: Path) -> None:
+        meta_json = json.dumps(dict(self.meta), ensure_ascii=False, sort_keys=True)
+        np.savez_compressed(path, meta_json=np.array(meta_json), **self._storage_arrays())
+
+    def to_npy_dir(self, path: Path) -> None:
+        """Write an uncompressed directory layout: one ``<field>.npy`` per array + ``meta.json``.
+
+        Unlike the npz, every array can be opened with ``mmap_mode="r"`` so several
+        worker processes share the same pages instead of each inflating a copy.
+        Index arrays left over from an earlier write (e.g. optional tables this
+        index does not have) are removed; other files in `path` are kept. Every
+        file is replaced through `atomic_write`, so a process that has the
+        directory open keeps seeing the old arrays until it reloads.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = self._storage_arrays()
+        for name, value in arrays.items():
+            with atomic_write(path / f"{name}.npy") as f:
+                np.save(f, np.ascontiguousarray(value), allow_pickle=False)
+        for file in path.glob("*.npy"):
+            if file.stem in _NPY_DIR_FILES and file.stem not in arrays:
+                file.unlink()
+        with atomic_write(path / NPY_DIR_META, "w", encoding="utf-8") as f:
+            json.dump(dict(self.meta), f, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+
+    @staticmethod
+    def from_npz(path: Path) -> "TISIndex":
+        with np.load(path, allow_pickle=False) as z:
+            meta_json = str(z["meta_json"].tolist())
+            meta = json.loads(meta_json)
+            arrays = {name: z[name] for name in z.files if name != "meta_json"}
+        return TISIndex._from_arrays(arrays, meta)
+
+    @staticmethod
+    def from_npy_dir(path: Path, *, mmap_mode: str | None = "r") -> "TISIndex":
+        """Open a `to_npy_dir` layout; arrays are memory-mapped read-only by default.
+
+        Only index array files are read; other ``.npy`` files in `path` are ignored.
+        """
+        path = Path(path)
+        with (path / NPY_DIR_META).open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            file.stem: np.load(file, mmap_mode=mmap_mode, allow_pickle=False)
+            for file in sorted(path.glob("*.npy"))
+            if file.stem in _NPY_DIR_FILES
+        }
+        return TISIndex._from_arrays(arrays, meta)
+
+    @staticmethod
+    def load(path: Path, *, mmap_mode: str | None = "r") -> "TISIndex":
+        """Open any on-disk index: a `to_npy_dir` directory or an npz (all variants)."""
+        path = Path(path)
+        if path.is_dir():
+            return TISIndex.from_npy_dir(path, mmap_mode=mmap_mode)
+        return TISIndex.from_npz(path)
+
+
+def build_name_lookup(
+    alias_names: StringTable, alias_offsets: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted UTF-8 name keys and their rows, for `TISIndex.rows_for_names`.
+
+    Like `TISIndex.build_name_to_row`, a name listed under several rows maps to the last one.
+    """
+    names = alias_names.tolist()
+    counts = np.diff(np.asarray(alias_offsets, dtype=np.int64))
+    rows = np.repeat(np.arange(counts.shape[0], dtype=np.int32), counts)
+    keys = np.array([n.encode("utf-8") for n in names], dtype=np.bytes_)
+    if not keys.shape[0]:
+        return keys, rows
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    rows = rows[order]
+    last_of_run = np.append(keys[1:] != keys[:-1], True)
+    return keys[last_of_run], rows[last_of_run]
+
 
 def build_tis_index(
     chords_to_bits: Mapping[str, Sequence[int]],
@@ -222,7 +718,24 @@ def build_tis_index(
     weights: np.ndarray = DEFAULT_WEIGHTS,
     bit_order: np.ndarray = DEFAULT_BIT_ORDER,
     source_name: str = "guitar_chords_chroma.json",
+    precompute_voice_leading: bool = False,
+    voice_leading_addition_penalty: int = 4,
+    precompute_key_features: bool = False,
+    compact_transpositions: bool = False,
 ) -> TISIndex:
+    """
+    Build a deduplicated TIS index (one row per unique chroma mask).
+
+    With ``precompute_voice_leading=True`` the full (M,M) voice-leading tension
+    matrix is stored as float32 so `compute_features` can read the `m` feature as
+    a single row slice instead of solving M assignment problems per query.
+    With ``precompute_key_features=True`` the (24,M) per-key d2/d3/function
+    tables are stored as well.
+    With ``compact_transpositions=True`` those tables exploit transposition
+    invariance instead: voice leading is stored only from each transposition
+    class's canonical chord, and key tables only for C major / C minor, both over
+    `closure_masks` columns and recovered by gathering (`TISIndex.closure_columns`).
+    """
     mask_to_aliases: dict[int, list[str]] = {}
     for chord_name, bits in chords_to_bits.items():
         mask = bits_to_mask(bits)
@@ -247,12 +760,12 @@ def build_tis_index(
         flat_aliases.extend(aliases)
         alias_offsets_list.append(len(flat_aliases))
 
-    rep_names = np.array(rep_names_list, dtype="<U64")
+    rep_names = StringTable.from_strings(rep_names_list)
     chroma_bits = np.array(rep_bits_list, dtype=np.uint8)
     rep_offsets = np.array(rep_offsets_list, dtype=np.int32)
-    rep_names_by_root = np.array(flat_reps, dtype="<U64")
+    rep_names_by_root = StringTable.from_strings(flat_reps)
     alias_offsets = np.array(alias_offsets_list, dtype=np.int32)
-    alias_names = np.array(flat_aliases, dtype="<U64")
+    alias_names = StringTable.from_strings(flat_aliases)
 
     tis = chroma_matrix_to_tis(chroma_bits, weights=weights)
     tis_norm = np.sqrt(np.sum(np.abs(tis) ** 2, axis=1))
@@ -266,9 +779,33 @@ def build_tis_index(
         "bit_order": [str(x) for x in bit_order.tolist()],
         "weights": [float(x) for x in np.asarray(weights, dtype=np.float64).tolist()],
         "num_chords": int(len(chords_to_bits)),
-        "num_vectors": int(rep_names.shape[0]),
+        "num_vectors": len(rep_names),
     }
-    return TISIndex(
+    transpositions = build_transposition_tables(masks)
+    closure_bits = None
+    if compact_transpositions:
+        closure = transpositions["closure_masks"].astype(np.int64)
+        closure_bits = ((closure[:, None] >> np.arange(CHROMA_LEN)) & 1).astype(np.uint8)
+    voice_leading = None
+    voice_leading_classes = None
+    if precompute_voice_leading:
+        # Local import: tonal_tension depends on this module.
+        from .tonal_tension.voice_leading import voice_leading_matrix
+
+        if closure_bits is not None:
+            class_cols = np.searchsorted(
+                transpositions["closure_masks"], transpositions["class_masks"]
+            )
+            voice_leading_classes = voice_leading_matrix(
+                closure_bits, addition_penalty=voice_leading_addition_penalty, rows=class_cols
+            )
+        else:
+            voice_leading = voice_leading_matrix(
+                chroma_bits, addition_penalty=voice_leading_addition_penalty
+            )
+        meta["voice_leading_addition_penalty"] = int(voice_leading_addition_penalty)
+    name_keys, name_rows = build_name_lookup(alias_names, alias_offsets)
+    index = TISIndex(
         rep_names=rep_names,
         chroma_bits=chroma_bits,
         chroma_mask=masks,
@@ -280,4 +817,22 @@ def build_tis_index(
         alias_offsets=alias_offsets,
         alias_names=alias_names,
         meta=meta,
+        voice_leading=voice_leading,
+        name_keys=name_keys,
+        name_rows=name_rows,
+        mask_table=build_mask_table(masks),
+        nearest_table=build_nearest_table(masks, tis, weights=weights),
+        voice_leading_classes=voice_leading_classes,
+        **transpositions,
+        **build_row_columns(masks, alias_names, alias_offsets, rep_names_by_root, rep_offsets),
     )
+    if precompute_key_features:
+        from .tonal_tension.key_features import build_key_feature_table
+
+        if closure_bits is not None:
+            closure_tis = chroma_matrix_to_tis(closure_bits, weights=weights)
+            tables = build_key_feature_table(closure_tis, key_ids=COMPACT_KEY_IDS)
+        else:
+            tables = build_key_feature_table(tis)
+        index = replace(index, **tables)
+    return index
@@ -4,22 +4,46 @@ This package factors the Entropy 2020 (Navarro-Cáceres et al.)-aligned pieces
 out of the CLI scripts so they are easy to tune and reuse.
 """
 
-from .features import compute_features
-from .hierarchy import hierarchical_tension_last, harmonic_function_label_from_tis
+from .analysis import analyze_progression
+from .constraints import ChordConstraints
+from .curve import follow_tension_curve
+from .features import compute_features, voice_leading_row
+from .hierarchy import (
+    IncrementalHierarchy,
+    hierarchical_tension_candidates,
+    hierarchical_tension_last,
+    harmonic_function_codes_from_tis,
+    harmonic_function_label_from_tis,
+    harmonic_function_labels_from_tis,
+)
 from .theory import parse_key, key_tis, function_prototypes
 from .weights import DEFAULT_WEIGHTS, PAPER_WEIGHTS_TABLE1
-from .model import compute_tension, suggest_next_chords
+from .model import compute_tension, score_weight_profiles, suggest_next_chords
+from .progression import ProgressionTree
+from .pcset_table import PitchClassSetTable, load_pcset_table
 
 __all__ = [
+    "ChordConstraints",
     "DEFAULT_WEIGHTS",
+    "IncrementalHierarchy",
     "PAPER_WEIGHTS_TABLE1",
+    "PitchClassSetTable",
+    "ProgressionTree",
+    "analyze_progression",
     "compute_features",
     "compute_tension",
+    "follow_tension_curve",
     "function_prototypes",
+    "harmonic_function_codes_from_tis",
     "harmonic_function_label_from_tis",
+    "harmonic_function_labels_from_tis",
+    "hierarchical_tension_candidates",
     "hierarchical_tension_last",
     "key_tis",
+    "load_pcset_table",
     "parse_key",
+    "score_weight_profiles",
     "suggest_next_chords",
+    "voice_leading_row",
 ]
 
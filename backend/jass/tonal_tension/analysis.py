@@ -0,0 +1,86 @@
+"""Tension of every chord in a recorded progression.
+
+Each position's indicators are computed for that chord only (d1 and m against
+the chord before it), and hierarchical tension comes from one `ProgressionTree`
+grown chord by chord, instead of one `compute_features` call over all M rows
+per position.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .dissonance import dissonance_tension_from_tis_norm
+from .features import FEATURE_NAMES, voice_leading_row
+from .key_features import key_features
+from .model import compute_tension
+from .progression import ProgressionTree
+
+
+def progression_rows_for(
+    index: TISIndex, progression: Sequence[str] | Sequence[int]
+) -> np.ndarray:
+    """Index rows of a progression given as chord names or as rows."""
+    if all(isinstance(x, str) for x in progression):
+        rows = index.rows_for_names(list(progression))
+        missing = np.flatnonzero(rows < 0)
+        if missing.shape[0]:
+            raise ValueError(f"Chord {progression[int(missing[0])]!r} not found in index.")
+        return rows
+    rows = np.asarray(progression, dtype=np.int64)
+    n = index.tis.shape[0]
+    if rows.ndim != 1 or np.any((rows < 0) | (rows >= n)):
+        raise ValueError(f"progression must be chord names or rows in [0, {n}).")
+    return rows
+
+
+def analyze_progression(
+    index: TISIndex,
+    progression: Sequence[str] | Sequence[int],
+    key_root: str,
+    key_mode: str = "major",
+    *,
+    weights: dict[str, float] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(n,6) features (columns in `FEATURE_NAMES` order) and (n,) tension of each chord.
+
+    Position i is scored as if it had been suggested after positions ``0..i-1``:
+    d1 and m against chord i-1 (0 for the first chord), h from the tree of
+    chords ``0..i`` (0 when chord i repeats chord i-1). With ``normalize`` the features are min-max normalized over
+    the progression's positions (not over all index rows, as for suggestions).
+    """
+    rows = progression_rows_for(index, progression)
+    n = rows.shape[0]
+    feats = np.zeros((n, len(FEATURE_NAMES)), dtype=np.float64)
+    if n == 0:
+        return feats, np.zeros(0, dtype=np.float64)
+    col = {name: j for j, name in enumerate(FEATURE_NAMES)}
+
+    diff = index.tis[rows[1:]] - index.tis[rows[:-1]]
+    feats[1:, col["d1"]] = np.sqrt(np.sum(np.abs(diff) ** 2, axis=1))
+    kf = key_features(index, key_root, key_mode)
+    feats[:, col["d2"]] = kf.d2[rows]
+    feats[:, col["d3"]] = kf.d3[rows]
+    feats[:, col["c"]] = dissonance_tension_from_tis_norm(index.tis_norm[rows])
+    for i in range(1, n):
+        feats[i, col["m"]] = voice_leading_row(
+            index, int(rows[i - 1]), voice_leading_addition_penalty, rows[i : i + 1]
+        )[0]
+
+    tree = ProgressionTree(index, key_root, key_mode)
+    for i, row in enumerate(rows.tolist()):
+        tree.append(row)
+        # A repeated chord is the previous chord as a candidate: h is 0, as in
+        # `compute_features`.
+        if i == 0 or row != rows[i - 1]:
+            feats[i, col["h"]] = tree.last_tension()
+
+    tension = compute_tension(
+        {name: feats[:, j] for name, j in col.items()}, weights=weights, normalize=normalize
+    )
+    return feats, tension
@@ -0,0 +1,93 @@
+"""Declarative candidate constraints for chord suggestions.
+
+A `ChordConstraints` compiles to a boolean mask over the index rows from the
+per-row columns stored with the index (`TISIndex.row_columns`) and its chroma
+masks, so features are only computed for the surviving candidates.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .theory import MAJOR_INTERVALS, MINOR_INTERVALS, PC_TO_IDX
+
+
+def scale_mask(key_root: str, key_mode: str = "major") -> int:
+    """12-bit chroma mask of the key's scale (natural minor for ``"minor"``)."""
+    intervals = MINOR_INTERVALS if key_mode == "minor" else MAJOR_INTERVALS
+    root = PC_TO_IDX[key_root]
+    return sum(1 << ((root + iv) % 12) for iv in intervals)
+
+
+@dataclass(frozen=True)
+class ChordConstraints:
+    """Which candidates a suggestion may return.
+
+    ``min_notes``/``max_notes`` bound the number of pitch classes, ``diatonic``
+    keeps chords whose notes all lie in the key's scale, ``roots`` keeps chords
+    that a displayed representative names with one of these roots (e.g.
+    ``("C", "F", "G")``; such a name is then shown first), and ``exclude_slash`` drops chords that can only be named as slash chords.
+    """
+
+    min_notes: int | None = None
+    max_notes: int | None = None
+    diatonic: bool = False
+    roots: tuple[str, ...] | None = None
+    exclude_slash: bool = False
+
+    def __post_init__(self) -> None:
+        if self.roots is not None:
+            unknown = [r for r in self.roots if r not in PC_TO_IDX]
+            if unknown:
+                raise ValueError(f"Unknown roots: {unknown}.")
+            object.__setattr__(self, "roots", tuple(self.roots))
+
+    @staticmethod
+    def from_mapping(spec: Mapping[str, Any]) -> "ChordConstraints":
+        """Build from a JSON-style mapping with the field names as keys."""
+        unknown = set(spec) - set(ChordConstraints.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Unknown constraints: {sorted(unknown)}.")
+        return ChordConstraints(**spec)
+
+    def root_bits(self) -> int | None:
+        """``roots`` as a 12-bit mask of pitch classes (bit p for root p), or None."""
+        if self.roots is None:
+            return None
+        return sum(1 << pc for pc in {PC_TO_IDX[r] for r in self.roots})
+
+    def row_mask(self, index: TISIndex, key_root: str, key_mode: str = "major") -> np.ndarray:
+        """(M,) bool: rows satisfying every constraint."""
+        allowed = np.ones(index.tis.shape[0], dtype=bool)
+        bounds = (self.min_notes, self.max_notes, self.roots)
+        if any(v is not None for v in bounds) or self.exclude_slash:
+            cols = index.row_columns()
+            if self.min_notes is not None:
+                allowed &= cols["note_count"] >= self.min_notes
+            if self.max_notes is not None:
+                allowed &= cols["note_count"] <= self.max_notes
+            if self.roots is not None:
+                allowed &= (cols["root_mask"] & self.root_bits()) != 0
+            if self.exclude_slash:
+                allowed &= ~cols["slash_only"]
+        if self.diatonic:
+            outside = ~scale_mask(key_root, key_mode) & 0xFFF
+            allowed &= (np.asarray(index.chroma_mask, dtype=np.int64) & outside) == 0
+        return allowed
+
+    def rows(self, index: TISIndex, key_root: str, key_mode: str = "major") -> np.ndarray:
+        """Indices of the rows satisfying every constraint."""
+        return np.flatnonzero(self.row_mask(index, key_root, key_mode))
+
+
+def as_constraints(
+    constraints: ChordConstraints | Mapping[str, Any] | None,
+) -> ChordConstraints | None:
+    """Accept a `ChordConstraints`, a mapping for `ChordConstraints.from_mapping`, or None."""
+    if constraints is None or isinstance(constraints, ChordConstraints):
+        return constraints
+    return ChordConstraints.from_mapping(constraints)
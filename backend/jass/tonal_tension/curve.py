@@ -0,0 +1,141 @@
+"""Follow a target tension curve with a Viterbi-style dynamic program.
+
+The state at step t is the chord played; the step cost of moving from chord i
+to chord j is ``|tension(i -> j) - target[t]|`` plus an optional voice-leading
+smoothness term, where ``tension(i -> j)`` is the model's tension of j as a
+suggestion after i. Hierarchical tension depends on the whole path, not just the
+previous chord, so it is left out (the remaining weights are renormalized).
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .features import compute_features_batch
+from .key_features import key_id
+from .model import compute_tension_batch, required_features
+from .weights import DEFAULT_WEIGHTS, normalize_weights
+
+
+def curve_weights(weights: dict[str, float] | None = None) -> dict[str, float]:
+    """`weights` without the path-dependent ``h``, renormalized to sum to 1."""
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    return normalize_weights({k: float(w) for k, w in weights.items() if k != "h"})
+
+
+def _transition_costs(
+    index: TISIndex,
+    states: np.ndarray,
+    kid: int,
+    *,
+    weights: dict[str, float],
+    normalize: bool,
+    smoothness: float,
+    voice_leading_addition_penalty: int,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """(S,M) tension of every chord after each of `states`, and the smoothness cost."""
+    want = required_features(weights, ("m",) if smoothness else ())
+    feats = compute_features_batch(
+        index,
+        states,
+        np.full(states.shape[0], kid),
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=want,
+    )
+    tension = compute_tension_batch(
+        feats, weights=weights, normalize=normalize, shape=(states.shape[0], index.tis.shape[0])
+    )
+    tension[np.arange(states.shape[0]), states] = np.nan
+    smooth = None
+    if smoothness:
+        smooth = compute_tension_batch(feats, weights={"m": smoothness}, normalize=True)
+    return tension, smooth
+
+
+def follow_tension_curve(
+    index: TISIndex,
+    start_row: int,
+    key_root: str,
+    key_mode: str = "major",
+    *,
+    targets: Sequence[float],
+    weights: dict[str, float] | None = None,
+    normalize: bool = True,
+    smoothness: float = 0.0,
+    prune: int | None = None,
+    voice_leading_addition_penalty: int = 4,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """The T-chord path after `start_row` whose tension best follows `targets`.
+
+    Minimizes the sum over steps of ``|tension - targets[t]|`` plus ``smoothness``
+    times the min-max normalized voice-leading cost of each move (0 to 1); a
+    chord never follows itself. Weights are passed through `curve_weights`.
+
+    Without ``prune`` every chord is a state at every step: the (M,M) tension
+    table is built once (fast only if the index stores the voice-leading matrix)
+    and each step is an O(M^2) NumPy reduction. With ``prune=k`` only the k
+    cheapest states of a step are expanded, so a step costs O(k*M).
+
+    Returns ``(rows, tension, cost)``: (T,) chords after the start, their (T,)
+    step tension, and the total cost.
+    """
+    targets_arr = np.asarray(targets, dtype=np.float64)
+    if targets_arr.ndim != 1 or targets_arr.shape[0] == 0:
+        raise ValueError("targets must be a non-empty 1-D sequence.")
+    if prune is not None and prune < 1:
+        raise ValueError("prune must be >= 1.")
+    w = curve_weights(weights)
+    kid = key_id(key_root, key_mode)
+    n = index.tis.shape[0]
+    opts = dict(
+        weights=w,
+        normalize=normalize,
+        smoothness=smoothness,
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+    )
+
+    cost = np.full(n, np.inf)
+    cost[start_row] = 0.0
+    full: tuple[np.ndarray, np.ndarray | None] | None = None
+    back = np.empty((targets_arr.shape[0], n), dtype=np.int64)
+    step_tension = np.empty((targets_arr.shape[0], n), dtype=np.float64)
+    for t, target in enumerate(targets_arr.tolist()):
+        states = np.flatnonzero(np.isfinite(cost))
+        if prune is not None and states.shape[0] > prune:
+            states = states[np.argsort(cost[states], kind="stable")[:prune]]
+        if prune is None and states.shape[0] > 1:
+            if full is None:
+                full = _transition_costs(index, np.arange(n), kid, **opts)
+            tension, smooth = full
+            if states.shape[0] < n:
+                tension = tension[states]
+                smooth = None if smooth is None else smooth[states]
+        else:
+            tension, smooth = _transition_costs(index, states, kid, **opts)
+
+        total = np.abs(tension - target)
+        if smooth is not None:
+            total += smooth
+        total += cost[states][:, None]
+        total[np.isnan(total)] = np.inf
+        best = np.argmin(total, axis=0)
+        cols = np.arange(n)
+        cost = total[best, cols]
+        back[t] = states[best]
+        step_tension[t] = tension[best, cols]
+
+    last = int(np.argmin(cost))
+    if not np.isfinite(cost[last]):
+        raise ValueError("No chord sequence reaches the end of the curve.")
+    rows = np.empty(targets_arr.shape[0], dtype=np.int64)
+    tension_path = np.empty(targets_arr.shape[0], dtype=np.float64)
+    row = last
+    for t in range(targets_arr.shape[0] - 1, -1, -1):
+        rows[t] = row
+        tension_path[t] = step_tension[t, row]
+        row = int(back[t, row])
+    return rows, tension_path, float(cost[last])
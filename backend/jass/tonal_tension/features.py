@@ -1,15 +1,145 @@
 from __future__ import annotations
 
-from typing import Sequence
+from typing import Collection, Sequence
 
 import numpy as np
 
+from ..lru import LRUCache
 from ..tis_index import TISIndex
-from ..tis_metrics import vectorized_angles
 from .dissonance import dissonance_tension_from_tis_norm
-from .hierarchy import harmonic_function_label_from_tis, hierarchical_tension_last
-from .theory import function_prototypes, key_tis
-from .voice_leading import voice_leading_tension
+from .hierarchy import hierarchical_tension_candidates
+from .key_features import KeyFeatures, key_features, key_from_id, key_id
+from .progression import ProgressionTree
+from .voice_leading import voice_leading_tension_batch
+
+
+FEATURE_NAMES = ("d1", "d2", "d3", "c", "m", "h")
+
+
+# Voice-leading rows kept per index by `voice_leading_row` when it stores no matrix.
+VOICE_LEADING_ROW_CACHE_SIZE = 256
+
+
+def voice_leading_row(
+    index: TISIndex,
+    prev_row: int,
+    addition_penalty: int,
+    rows: np.ndarray | None = None,
+) -> np.ndarray:
+    """Voice-leading tension from `prev_row` to every row (or to `rows`); 0 for `prev_row`."""
+    targets = np.arange(index.tis.shape[0]) if rows is None else np.asarray(rows, dtype=np.int64)
+    stored = index.meta.get("voice_leading_addition_penalty") == addition_penalty
+    if index.voice_leading is not None and stored:
+        m = index.voice_leading[prev_row][targets].astype(np.float64)
+    elif index.voice_leading_classes is not None and stored:
+        # Transposition-compact matrix: m(prev, x) = m(prev's class chord, x transposed down).
+        cols = index.closure_columns(-int(index.class_offset[prev_row]))[targets]
+        m = index.voice_leading_classes[index.class_id[prev_row]][cols].astype(np.float64)
+    else:
+        # Fallback for indexes built without the precomputed matrix: full rows are
+        # computed once and kept in an LRU; a subset is computed directly unless cached.
+        cache: LRUCache[np.ndarray] = index.memo(
+            "voice_leading_row_cache", lambda: LRUCache(VOICE_LEADING_ROW_CACHE_SIZE)
+        )
+        cache_key = (int(prev_row), int(addition_penalty))
+        if rows is None or cache_key in cache:
+            full = cache.get(cache_key)
+            if full is None:
+                full = voice_leading_tension_batch(
+                    index.chroma_bits[prev_row],
+                    index.chroma_bits,
+                    addition_penalty=addition_penalty,
+                )
+                full.setflags(write=False)
+                cache.put(cache_key, full)
+            m = full[targets]
+        else:
+            m = voice_leading_tension_batch(
+                index.chroma_bits[prev_row],
+                index.chroma_bits[targets],
+                addition_penalty=addition_penalty,
+            )
+    m[targets == prev_row] = 0.0
+    return m
+
+
+def _hierarchical_row(
+    index: TISIndex,
+    prev_row: int,
+    kf: KeyFeatures,
+    progression_rows: Sequence[int],
+    rows: np.ndarray | None = None,
+) -> np.ndarray:
+    """Hierarchical tension of every row (or of `rows`) appended to `progression_rows`."""
+    prog_rows = list(map(int, progression_rows))
+    if rows is None:
+        cand_tis, cand_labels, cand_distances = index.tis, kf.function_labels, kf.d2
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+        cand_tis, cand_labels, cand_distances = (
+            index.tis[rows],
+            kf.function_labels[rows],
+            kf.d2[rows],
+        )
+    h = hierarchical_tension_candidates(
+        tis_list=[index.tis[r] for r in prog_rows],
+        func_labels=[kf.function_label(r) for r in prog_rows],
+        key_distances=[float(kf.d2[r]) for r in prog_rows],
+        cand_tis=cand_tis,
+        cand_labels=cand_labels,
+        cand_distances=cand_distances,
+    )
+    if rows is None:
+        h[prev_row] = 0.0
+    else:
+        h[rows == prev_row] = 0.0
+    return h
+
+
+def compute_row_features(
+    index: TISIndex,
+    prev_row: int,
+    rows: Sequence[int] | np.ndarray,
+    key_root: str,
+    key_mode: str,
+    *,
+    progression_rows: Sequence[int] | None = None,
+    voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """`compute_features` for the given candidate rows only."""
+    want = feature_set(features)
+    rows_arr = np.asarray(rows, dtype=np.int64)
+    out: dict[str, np.ndarray] = {}
+    if "d1" in want:
+        diff = index.tis[rows_arr] - index.tis[prev_row][None, :]
+        out["d1"] = np.sqrt(np.sum(np.abs(diff) ** 2, axis=1))
+    if want & {"d2", "d3", "h"}:
+        kf = key_features(index, key_root, key_mode)
+        if "d2" in want:
+            out["d2"] = kf.d2[rows_arr]
+        if "d3" in want:
+            out["d3"] = kf.d3[rows_arr]
+    if "c" in want:
+        out["c"] = dissonance_tension_from_tis_norm(index.tis_norm[rows_arr])
+    if "m" in want:
+        out["m"] = voice_leading_row(index, prev_row, voice_leading_addition_penalty, rows_arr)
+    if "h" in want:
+        if progression_rows:
+            out["h"] = _hierarchical_row(index, prev_row, kf, progression_rows, rows_arr)
+        else:
+            out["h"] = np.zeros(rows_arr.shape[0], dtype=np.float64)
+    return out
+
+
+def feature_set(features: Collection[str] | None) -> frozenset[str]:
+    """Validated set of feature names to compute; None means all of `FEATURE_NAMES`."""
+    if features is None:
+        return frozenset(FEATURE_NAMES)
+    unknown = set(features) - set(FEATURE_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown features: {sorted(unknown)}; expected a subset of {FEATURE_NAMES}.")
+    return frozenset(features)
 
 
 def compute_features(
@@ -19,58 +149,169 @@ def compute_features(
     key_mode: str,
     *,
     progression_rows: Sequence[int] | None = None,
+    progression_tree: ProgressionTree | None = None,
     voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
 ) -> dict[str, np.ndarray]:
-    """Compute paper-aligned tension indicators for every chord in the index."""
+    """Compute paper-aligned tension indicators for every chord in the index.
+
+    Hierarchical tension uses either ``progression_rows`` (tree rebuilt per call)
+    or a live ``progression_tree`` ending in ``prev_row`` (tree reused).
+    Only the indicators named in ``features`` (default: all) are computed and
+    returned; the others are absent from the result, not zero.
+    """
+    if progression_rows and progression_tree is not None:
+        raise ValueError("Pass either progression_rows or progression_tree, not both.")
+    want = feature_set(features)
     n = index.tis.shape[0]
-    prev_tis = index.tis[prev_row]
-    prev_bits = index.chroma_bits[prev_row].tolist()
-
-    diff = index.tis - prev_tis[None, :]
-    d1 = np.sqrt(np.sum(np.abs(diff) ** 2, axis=1)) # this is the euclidean distance between the current chord and the previous one.
-
-    k_tis = key_tis(key_root, key_mode)
-    d2 = vectorized_angles(index.tis_unit, k_tis) # 
-
-    protos = function_prototypes(key_root, key_mode)
-    offset = index.tis - k_tis[None, :]
-    offset_norm = np.sqrt(np.sum(np.abs(offset) ** 2, axis=1))
-    offset_unit = np.zeros_like(offset)
-    good = offset_norm > 0
-    offset_unit[good] = offset[good] / offset_norm[good, None]
-    d3 = np.full(n, np.inf, dtype=np.float64)
-    for proto in protos.values():
-        proto_off = proto - k_tis
-        d3 = np.minimum(d3, vectorized_angles(offset_unit, proto_off))
-
-    c = dissonance_tension_from_tis_norm(index.tis_norm)
-
-    m = np.zeros(n, dtype=np.float64)
-    for i in range(n):
-        if i == prev_row:
-            continue
-        m[i] = voice_leading_tension(
-            prev_bits,
-            index.chroma_bits[i].tolist(),
-            addition_penalty=voice_leading_addition_penalty,
+    out: dict[str, np.ndarray] = {}
+
+    if "d1" in want:
+        diff = index.tis - index.tis[prev_row][None, :]
+        out["d1"] = np.sqrt(np.sum(np.abs(diff) ** 2, axis=1)) # this is the euclidean distance between the current chord and the previous one.
+
+    # d2, d3 and function labels depend only on the key; h needs the labels and d2.
+    if want & {"d2", "d3", "h"}:
+        kf = key_features(index, key_root, key_mode)
+        if "d2" in want:
+            out["d2"] = kf.d2
+        if "d3" in want:
+            out["d3"] = kf.d3
+
+    if "c" in want:
+        out["c"] = dissonance_tension_from_tis_norm(index.tis_norm)
+
+    if "m" in want:
+        out["m"] = voice_leading_row(index, prev_row, voice_leading_addition_penalty)
+
+    if "h" in want:
+        h = np.zeros(n, dtype=np.float64)
+        if progression_rows:
+            h = _hierarchical_row(index, prev_row, kf, progression_rows)
+        elif progression_tree is not None and len(progression_tree):
+            if progression_tree.last_row != prev_row:
+                raise ValueError("progression_tree must end with prev_row.")
+            h = progression_tree.candidate_tension()
+        out["h"] = h
+
+    return out
+
+
+# Feature sets kept per index by `cached_features` (about 6*M*8 bytes each).
+FEATURE_TENSOR_CACHE_SIZE = 64
+
+
+def cached_features(
+    index: TISIndex,
+    prev_row: int,
+    key_root: str,
+    key_mode: str,
+    *,
+    progression_rows: Sequence[int] | None = None,
+    voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """`compute_features` memoized per index in an LRU.
+
+    Keyed by (previous row, key, progression rows, penalty, feature set), so
+    re-scoring the same query under other weights or goals skips feature work.
+    The returned arrays are shared between calls and therefore read-only.
+    """
+    cache: LRUCache[dict[str, np.ndarray]] = index.memo(
+        "feature_tensor_cache", lambda: LRUCache(FEATURE_TENSOR_CACHE_SIZE)
+    )
+    cache_key = (
+        int(prev_row),
+        key_id(key_root, key_mode),
+        tuple(int(r) for r in progression_rows or ()),
+        int(voice_leading_addition_penalty),
+        feature_set(features),
+    )
+    feats = cache.get(cache_key)
+    if feats is None:
+        feats = compute_features(
+            index,
+            prev_row,
+            key_root,
+            key_mode,
+            progression_rows=progression_rows,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=features,
         )
+        for arr in feats.values():
+            arr.setflags(write=False)
+        cache.put(cache_key, feats)
+    return feats
 
-    h = np.zeros(n, dtype=np.float64)
-    if progression_rows:
-        prog_rows = list(map(int, progression_rows))
-        prog_tis = [index.tis[r] for r in prog_rows]
-        prog_funcs = [harmonic_function_label_from_tis(t, protos) for t in prog_tis]
-        prog_d2 = [float(d2[r]) for r in prog_rows]
-        for i in range(n):
-            if i == prev_row:
-                continue
-            cand_tis = index.tis[i]
-            cand_func = harmonic_function_label_from_tis(cand_tis, protos)
-            cand_d2 = float(d2[i])
-            h[i] = hierarchical_tension_last(
-                tis_list=prog_tis + [cand_tis],
-                func_labels=prog_funcs + [cand_func],
-                key_distances=prog_d2 + [cand_d2],
-            )
 
-    return {"d1": d1, "d2": d2, "d3": d3, "c": c, "m": m, "h": h}
+# Queries per block in `compute_features_batch`; bounds the (B,M,6) d1 temporary.
+BATCH_BLOCK = 64
+
+
+def compute_features_batch(
+    index: TISIndex,
+    prev_rows: Sequence[int] | np.ndarray,
+    key_ids: Sequence[int] | np.ndarray,
+    *,
+    progression_rows: Sequence[Sequence[int] | None] | None = None,
+    voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """`compute_features` for Q (previous row, key id) queries at once, as (Q,M) arrays.
+
+    d1 is computed by broadcasting, d2/d3 are gathered per distinct key, and m
+    per distinct previous row (one matrix gather when the index stores it).
+    ``progression_rows[q]``, when given, adds hierarchical tension for query q.
+    As in `compute_features`, only ``features`` (default: all) are computed.
+    """
+    want = feature_set(features)
+    prev = np.asarray(prev_rows, dtype=np.int64)
+    kids = np.asarray(key_ids, dtype=np.int64)
+    if prev.shape != kids.shape or prev.ndim != 1:
+        raise ValueError("prev_rows and key_ids must be 1-D and of equal length.")
+    q = prev.shape[0]
+    n = index.tis.shape[0]
+    out: dict[str, np.ndarray] = {}
+
+    if "d1" in want:
+        d1 = out["d1"] = np.empty((q, n), dtype=np.float64)
+        for lo in range(0, q, BATCH_BLOCK):
+            diff = index.tis[None, :, :] - index.tis[prev[lo : lo + BATCH_BLOCK]][:, None, :]
+            d1[lo : lo + BATCH_BLOCK] = np.sqrt(np.sum(np.abs(diff) ** 2, axis=2))
+
+    per_key: dict[int, KeyFeatures] = {}
+    if want & {"d2", "d3", "h"}:
+        for kid in np.unique(kids).tolist():
+            per_key[kid] = key_features(index, *key_from_id(kid))
+    for name in ("d2", "d3"):
+        if name in want:
+            vals = out[name] = np.empty((q, n), dtype=np.float64)
+            for kid, kf in per_key.items():
+                vals[kids == kid] = getattr(kf, name)
+
+    if "c" in want:
+        c = dissonance_tension_from_tis_norm(index.tis_norm)
+        out["c"] = np.broadcast_to(c, (q, n)).copy()
+
+    if "m" in want:
+        if (
+            index.voice_leading is not None
+            and index.meta.get("voice_leading_addition_penalty") == voice_leading_addition_penalty
+        ):
+            m = index.voice_leading[prev].astype(np.float64)
+            m[np.arange(q), prev] = 0.0
+        else:
+            m = np.empty((q, n), dtype=np.float64)
+            for row in np.unique(prev).tolist():
+                m[prev == row] = voice_leading_row(index, row, voice_leading_addition_penalty)
+        out["m"] = m
+
+    if "h" in want:
+        h = out["h"] = np.zeros((q, n), dtype=np.float64)
+        for i, rows in enumerate(progression_rows or ()):
+            if rows:
+                if int(rows[-1]) != int(prev[i]):
+                    raise ValueError(f"progression_rows[{i}] must end with prev_rows[{i}].")
+                h[i] = _hierarchical_row(index, int(prev[i]), per_key[int(kids[i])], rows)
+
+    return out
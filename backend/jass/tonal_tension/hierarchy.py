@@ -5,7 +5,19 @@ from typing import Sequence
 
 import numpy as np
 
-from ..tis_index import angle, euclidean_distance
+from ..tis_index import TISIndex, euclidean_distance
+
+
+# Label codes returned by `harmonic_function_codes_from_tis` index into this tuple.
+FUNCTION_LABELS = ("t", "s", "d")
+_PROTO_LABELS = {"tonic": "t", "subdominant": "s", "dominant": "d"}
+
+# Cosine difference below which two prototypes count as tied for a chord.
+FUNCTION_TIE_TOLERANCE = 1e-9
+
+# Key distances (angles) closer than this count as tied when choosing a head; the
+# earlier chord then wins. Angles near 0 carry ~1e-8 of arccos noise.
+KEY_DISTANCE_TOLERANCE = 1e-7
 
 
 @dataclass
@@ -25,51 +37,80 @@ class Node:
         right.parent = self
 
 
+def harmonic_function_codes_from_tis(
+    tis: np.ndarray | TISIndex, protos: dict[str, np.ndarray]
+) -> np.ndarray:
+    """Label every row of an (N,6) TIS matrix (or a `TISIndex`) with one (N,3) angle pass.
+
+    Returns (N,) int8 codes into `FUNCTION_LABELS` (t / s / d via min angle to I/IV/V).
+    Ties resolve to the first prototype, like the scalar version. Cosines within
+    `FUNCTION_TIE_TOLERANCE` count as tied, so rows with exactly tied angles get
+    the same label whatever float noise their TIS carries (e.g. after transposing).
+    """
+    if isinstance(tis, TISIndex):
+        tis = tis.tis
+    tis = np.asarray(tis)
+    if tis.ndim != 2:
+        raise ValueError(f"tis must be a 2D array; got shape {tis.shape}.")
+    names = list(protos)
+    codes = np.array([FUNCTION_LABELS.index(_PROTO_LABELS[n]) for n in names], dtype=np.int8)
+    p = np.stack([np.asarray(protos[n]) for n in names])  # (3,6)
+
+    dots = np.sum(tis[:, None, :] * np.conj(p)[None, :, :], axis=2)  # (N,3)
+    tis_norm = np.sqrt(np.real(np.sum(tis * np.conj(tis), axis=1)))
+    p_norm = np.sqrt(np.real(np.sum(p * np.conj(p), axis=1)))
+    denom = tis_norm[:, None] * p_norm[None, :]
+    if np.any(denom == 0):
+        raise ValueError("cosine_similarity undefined for zero-norm vector.")
+    cos = np.clip(np.abs(dots) / denom, 0.0, 1.0)
+    # Min angle == max cosine; the first prototype within tolerance of the best wins.
+    tied = cos >= cos.max(axis=1, keepdims=True) - FUNCTION_TIE_TOLERANCE
+    return codes[np.argmax(tied, axis=1)]
+
+
+def harmonic_function_labels_from_tis(
+    tis: np.ndarray | TISIndex, protos: dict[str, np.ndarray]
+) -> np.ndarray:
+    """Like `harmonic_function_codes_from_tis`, but returns an (N,) array of 't'/'s'/'d'."""
+    return np.asarray(FUNCTION_LABELS)[harmonic_function_codes_from_tis(tis, protos)]
+
+
 def harmonic_function_label_from_tis(tis: np.ndarray, protos: dict[str, np.ndarray]) -> str:
     """Map a chord TIS to paper function labels: t / s / d via min angle to I/IV/V."""
-    best = None
-    best_name = None
-    for name, proto in protos.items():
-        a = angle(tis, proto)
-        if best is None or a < best:
-            best = a
-            best_name = name
-    return {"tonic": "t", "subdominant": "s", "dominant": "d"}[str(best_name)]
+    code = harmonic_function_codes_from_tis(np.asarray(tis)[None, :], protos)[0]
+    return FUNCTION_LABELS[int(code)]
 
 
-def hierarchical_tension_last(
-    *,
-    tis_list: Sequence[np.ndarray],
-    func_labels: Sequence[str],
-    key_distances: Sequence[float],
-) -> float:
-    """Compute hierarchical tension h for the last chord (Eq. (9)).
+_REGION = {"t": "TR", "s": "SR", "d": "DR"}
+_HEAD_PRIORITY = {"t": 0, "s": 1, "d": 2}
 
-    Deterministic heuristic for Section 3.6 tree construction (Rohrmeier-style).
-    """
-    n = len(tis_list)
-    if n <= 1:
-        return 0.0
-    if len(func_labels) != n or len(key_distances) != n:
-        raise ValueError("tis_list, func_labels, and key_distances must have equal length.")
 
-    region = {"t": "TR", "s": "SR", "d": "DR"}
+def _stable_head(
+    a: int, b: int, func_labels: Sequence[str], key_distances: Sequence[float]
+) -> int:
+    pa = _HEAD_PRIORITY.get(func_labels[a], 9)
+    pb = _HEAD_PRIORITY.get(func_labels[b], 9)
+    if pa != pb:
+        return a if pa < pb else b
+    kd_a, kd_b = float(key_distances[a]), float(key_distances[b])
+    return a if kd_a <= kd_b + KEY_DISTANCE_TOLERANCE else b
+
+
+def _reduce_regions(func_labels: Sequence[str]) -> tuple[list[Node], list[Node]]:
+    """Apply the SR-DR / DR-TR / TR-DR region rules until none matches.
+
+    Returns the remaining top-level nodes (left to right) and the leaf nodes.
+    """
     nodes: list[Node] = []
     leaf_nodes: list[Node] = []
     for i, f in enumerate(func_labels):
-        k = region.get(f)
+        k = _REGION.get(f)
         if k is None:
             raise ValueError(f"Unknown function label: {f!r}")
         node = Node(kind=k, start=i, end=i + 1, head_pos=i)
         nodes.append(node)
         leaf_nodes.append(node)
 
-    def stable_head(a: int, b: int) -> int:
-        prio = {"t": 0, "s": 1, "d": 2}
-        ta = (prio.get(func_labels[a], 9), float(key_distances[a]))
-        tb = (prio.get(func_labels[b], 9), float(key_distances[b]))
-        return a if ta <= tb else b
-
     def merge(i: int, kind: str, head_pos: int) -> None:
         left = nodes[i]
         right = nodes[i + 1]
@@ -102,10 +143,30 @@ def hierarchical_tension_last(
                 merge(i, "TR", a.head_pos)
                 changed = True
                 break
+    return nodes, leaf_nodes
+
+
+def hierarchical_tension_last(
+    *,
+    tis_list: Sequence[np.ndarray],
+    func_labels: Sequence[str],
+    key_distances: Sequence[float],
+) -> float:
+    """Compute hierarchical tension h for the last chord (Eq. (9)).
+
+    Deterministic heuristic for Section 3.6 tree construction (Rohrmeier-style).
+    """
+    n = len(tis_list)
+    if n <= 1:
+        return 0.0
+    if len(func_labels) != n or len(key_distances) != n:
+        raise ValueError("tis_list, func_labels, and key_distances must have equal length.")
+
+    nodes, leaf_nodes = _reduce_regions(func_labels)
 
     while len(nodes) > 1:
         a, b = nodes[0], nodes[1]
-        head = stable_head(a.head_pos, b.head_pos)
+        head = _stable_head(a.head_pos, b.head_pos, func_labels, key_distances)
         new = Node(kind="ROOT", start=a.start, end=b.end, head_pos=head)
         new.set_children(a, b)
         nodes[0:2] = [new]
@@ -128,3 +189,389 @@ def hierarchical_tension_last(
     for hp in parent_heads:
         total += euclidean_distance(ti, tis_list[hp])
     return float(total / len(parent_heads))
+
+
+@dataclass(frozen=True)
+class CandidateHeadPlan:
+    """Parent heads of a chord appended to a progression, for one function label.
+
+    ``heads`` are the distinct parent-head positions (bottom-up) that do not depend
+    on the candidate's key distance. ``contested`` is the root head that is added
+    only if it beats the candidate in the final ROOT merge, i.e. when
+    ``(prio(contested), kd(contested)) <= (prio(label), kd(candidate))``.
+    """
+
+    label: str
+    heads: tuple[int, ...]
+    contested: int | None = None
+
+
+def _plan_from_nodes(
+    nodes: Sequence[Node],
+    last_leaf: Node,
+    label: str,
+    func_labels: Sequence[str],
+    key_distances: Sequence[float],
+) -> CandidateHeadPlan:
+    """Derive the plan from region-reduced `nodes` whose last leaf is the candidate."""
+    cand = last_leaf.head_pos
+    chain: list[int] = []
+    current = last_leaf.parent
+    while current is not None:
+        chain.append(int(current.head_pos))
+        current = current.parent
+
+    contested: int | None = None
+    if len(nodes) > 1:
+        # The ROOT phase is a left fold; only its final merge is an ancestor of the candidate.
+        acc = nodes[0].head_pos
+        for node in nodes[1:-1]:
+            acc = _stable_head(acc, node.head_pos, func_labels, key_distances)
+        last_head = nodes[-1].head_pos
+        if last_head != cand:
+            chain.append(_stable_head(acc, last_head, func_labels, key_distances))
+        else:
+            contested = acc
+
+    heads: list[int] = []
+    for hp in chain:
+        if hp != cand and (not heads or heads[-1] != hp):
+            heads.append(hp)
+    if contested is not None and heads and heads[-1] == contested:
+        contested = None
+    return CandidateHeadPlan(label=label, heads=tuple(heads), contested=contested)
+
+
+def candidate_head_plan(
+    func_labels: Sequence[str], key_distances: Sequence[float], label: str
+) -> CandidateHeadPlan:
+    """Build the progression tree with one appended chord labelled `label`."""
+    if len(func_labels) != len(key_distances):
+        raise ValueError("func_labels and key_distances must have equal length.")
+    labels = list(func_labels) + [label]
+    # The candidate's key distance never influences the region rules; use a placeholder.
+    distances = list(key_distances) + [0.0]
+    nodes, leaf_nodes = _reduce_regions(labels)
+    return _plan_from_nodes(nodes, leaf_nodes[-1], label, labels, distances)
+
+
+def evaluate_head_plans(
+    plans: Sequence[CandidateHeadPlan],
+    *,
+    tis_list: Sequence[np.ndarray],
+    func_labels: Sequence[str],
+    key_distances: Sequence[float],
+    cand_tis: np.ndarray,
+    cand_labels: np.ndarray,
+    cand_distances: np.ndarray,
+) -> np.ndarray:
+    """Vectorized Eq. (9) for every candidate, given one plan per function label."""
+    cand_tis = np.asarray(cand_tis)
+    cand_labels = np.asarray(cand_labels)
+    cand_distances = np.asarray(cand_distances, dtype=np.float64)
+    out = np.zeros(cand_tis.shape[0], dtype=np.float64)
+    covered = np.zeros(cand_tis.shape[0], dtype=bool)
+
+    for plan in plans:
+        sel = cand_labels == plan.label
+        covered |= sel
+        if not np.any(sel):
+            continue
+        ct = cand_tis[sel]
+
+        def dist(hp: int) -> np.ndarray:
+            diff = ct - np.asarray(tis_list[hp])[None, :]
+            return np.sqrt(np.sum(np.abs(diff) ** 2, axis=1))
+
+        total = np.zeros(ct.shape[0], dtype=np.float64)
+        for hp in plan.heads:
+            total += dist(hp)
+        count = np.full(ct.shape[0], len(plan.heads), dtype=np.float64)
+        if plan.contested is not None:
+            c = plan.contested
+            prio_c = _HEAD_PRIORITY.get(func_labels[c], 9)
+            prio_l = _HEAD_PRIORITY.get(plan.label, 9)
+            kd_c = float(key_distances[c])
+            ties = kd_c <= cand_distances[sel] + KEY_DISTANCE_TOLERANCE
+            wins = (prio_c < prio_l) | ((prio_c == prio_l) & ties)
+            total += np.where(wins, dist(c), 0.0)
+            count += wins
+        out[sel] = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+    if not np.all(covered):
+        bad = cand_labels[~covered][0]
+        raise ValueError(f"Unknown function label: {bad!r}")
+    return out
+
+
+def hierarchical_tension_candidates(
+    *,
+    tis_list: Sequence[np.ndarray],
+    func_labels: Sequence[str],
+    key_distances: Sequence[float],
+    cand_tis: np.ndarray,
+    cand_labels: np.ndarray,
+    cand_distances: np.ndarray,
+) -> np.ndarray:
+    """`hierarchical_tension_last` for each candidate appended to a progression.
+
+    The progression tree is built once per function label (t/s/d) rather than once
+    per candidate; the final distances are one vectorized pass over all candidates.
+    Returns an (N,) array aligned with `cand_tis` / `cand_labels` / `cand_distances`.
+    """
+    if len(func_labels) != len(tis_list) or len(key_distances) != len(tis_list):
+        raise ValueError("tis_list, func_labels, and key_distances must have equal length.")
+    if not tis_list:
+        return np.zeros(np.asarray(cand_tis).shape[0], dtype=np.float64)
+    plans = [candidate_head_plan(func_labels, key_distances, label) for label in FUNCTION_LABELS]
+    return evaluate_head_plans(
+        plans,
+        tis_list=tis_list,
+        func_labels=func_labels,
+        key_distances=key_distances,
+        cand_tis=cand_tis,
+        cand_labels=cand_labels,
+        cand_distances=cand_distances,
+    )
+
+
+class _SlotNode:
+    """Compact region node for `IncrementalHierarchy` (leaves have ``right is None``)."""
+
+    __slots__ = ("kind", "start", "end", "head_pos", "right")
+
+    def __init__(
+        self, kind: str, start: int, end: int, head_pos: int, right: "_SlotNode | None" = None
+    ):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.head_pos = head_pos
+        self.right = right
+
+
+# (left kind, right kind) -> (merged kind, head taken from the right child), in rule priority order.
+_RULES = (("SR", "DR", "DR", True), ("DR", "TR", "TR", True), ("TR", "DR", "TR", False))
+
+
+def _reduce_slot_nodes(nodes: list[_SlotNode], lo: int) -> int:
+    """In-place `_reduce_regions` for a list whose prefix ``nodes[:lo]`` is already reduced.
+
+    Pairs entirely inside the reduced prefix never match, so each rule scan starts
+    just before the leftmost node created since then. Returns that position.
+    """
+    changed = True
+    while changed and len(nodes) > 1:
+        changed = False
+        for left_kind, right_kind, kind, head_right in _RULES:
+            for i in range(max(lo - 1, 0), len(nodes) - 1):
+                a, b = nodes[i], nodes[i + 1]
+                if a.kind == left_kind and b.kind == right_kind:
+                    head = b.head_pos if head_right else a.head_pos
+                    nodes[i : i + 2] = [_SlotNode(kind, a.start, b.end, head, right=b)]
+                    lo = min(lo, i)
+                    changed = True
+                    break
+            if changed:
+                break
+    return lo
+
+
+class IncrementalHierarchy:
+    """Hierarchical-tension tree state for a progression that grows one chord at a time.
+
+    Appending a chord keeps every reduced region node except the last one, which
+    is re-expanded into its leaves and reduced again together with the new leaf;
+    this yields the same tree as rebuilding from scratch. The ROOT-phase left fold
+    is cached per top-level node. With ``window`` set, only the last ``window``
+    chords are kept: the oldest is evicted by re-expanding just the first node,
+    so per-append cost stays bounded in long sessions.
+    """
+
+    def __init__(self, *, window: int | None = None):
+        if window is not None and window < 1:
+            raise ValueError("window must be >= 1.")
+        self.window = window
+        self._tis = np.zeros((16, 6), dtype=np.complex128)
+        self._labels: list[str] = []
+        self._distances: list[float] = []
+        self._nodes: list[_SlotNode] = []
+        self._fold: list[int] = []  # _fold[i]: ROOT-phase head over self._nodes[: i + 1]
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @property
+    def tis(self) -> np.ndarray:
+        return self._tis[: len(self._labels)]
+
+    @property
+    def func_labels(self) -> list[str]:
+        return list(self._labels)
+
+    @property
+    def key_distances(self) -> list[float]:
+        return list(self._distances)
+
+    def clear(self) -> None:
+        self._labels.clear()
+        self._distances.clear()
+        self._nodes.clear()
+        self._fold.clear()
+
+    def append(self, tis: np.ndarray, label: str, key_distance: float) -> None:
+        if label not in _REGION:
+            raise ValueError(f"Unknown function label: {label!r}")
+        while self.window is not None and len(self._labels) >= self.window:
+            self._evict_first()
+        self._push(tis, label, key_distance)
+
+    def _evict_first(self) -> None:
+        """Drop the oldest chord, keeping every top-level node except the first.
+
+        The first node is re-expanded into its remaining leaves and reduced again
+        with the rest; positions shift down by one and the ROOT fold is rebuilt.
+        """
+        n = len(self._labels)
+        first = self._nodes[0]
+        self._tis[: n - 1] = self._tis[1:n]
+        del self._labels[0]
+        del self._distances[0]
+        rest = self._nodes[1:]
+        for top in rest:
+            node: _SlotNode | None = top
+            while node is not None:
+                node.start -= 1
+                node.end -= 1
+                node.head_pos -= 1
+                node = node.right
+        nodes = [
+            _SlotNode(_REGION[self._labels[i]], i, i + 1, i)
+            for i in range(first.start, first.end - 1)
+        ]
+        nodes.extend(rest)
+        _reduce_slot_nodes(nodes, 0)
+        self._nodes = nodes
+        self._fold = []
+        self._fold = self._fold_heads(nodes, 0, self._labels, self._distances)
+
+    def _push(self, tis: np.ndarray, label: str, key_distance: float) -> None:
+        pos = len(self._labels)
+        if pos == self._tis.shape[0]:
+            grown = np.zeros((2 * pos, self._tis.shape[1]), dtype=self._tis.dtype)
+            grown[:pos] = self._tis
+            self._tis = grown
+        self._tis[pos] = tis
+        self._labels.append(label)
+        self._distances.append(float(key_distance))
+
+        nodes, lo = self._expand_with_leaf(pos, label)
+        lo = _reduce_slot_nodes(nodes, lo)
+        self._nodes = nodes
+        del self._fold[lo:]
+        self._fold.extend(self._fold_heads(nodes, lo, self._labels, self._distances))
+
+    def _expand_with_leaf(self, pos: int, label: str) -> tuple[list[_SlotNode], int]:
+        """Top-level nodes with the last one re-expanded into leaves, plus a new leaf."""
+        nodes = self._nodes[:-1]
+        lo = len(nodes)
+        if self._nodes:
+            last = self._nodes[-1]
+            for i in range(last.start, last.end):
+                nodes.append(_SlotNode(_REGION[self._labels[i]], i, i + 1, i))
+        nodes.append(_SlotNode(_REGION[label], pos, pos + 1, pos))
+        return nodes, lo
+
+    def _fold_heads(
+        self,
+        nodes: Sequence[_SlotNode],
+        lo: int,
+        func_labels: Sequence[str],
+        key_distances: Sequence[float],
+    ) -> list[int]:
+        out: list[int] = []
+        acc = self._fold[lo - 1] if lo > 0 else None
+        for node in nodes[lo:]:
+            if acc is None:
+                acc = node.head_pos
+            else:
+                acc = _stable_head(acc, node.head_pos, func_labels, key_distances)
+            out.append(acc)
+        return out
+
+    @staticmethod
+    def _spine_heads(node: _SlotNode) -> list[int]:
+        """Heads of the ancestors of the rightmost leaf within `node`, bottom-up."""
+        heads: list[int] = []
+        while node.right is not None:
+            heads.append(node.head_pos)
+            node = node.right
+        heads.reverse()
+        return heads
+
+    def last_tension(self) -> float:
+        """`hierarchical_tension_last` for the current (windowed) progression."""
+        n = len(self._labels)
+        if n <= 1:
+            return 0.0
+        chain = self._spine_heads(self._nodes[-1])
+        if len(self._nodes) > 1:
+            last_head = self._nodes[-1].head_pos
+            chain.append(_stable_head(self._fold[-2], last_head, self._labels, self._distances))
+        heads: list[int] = []
+        for hp in chain:
+            if hp != n - 1 and (not heads or heads[-1] != hp):
+                heads.append(hp)
+        if not heads:
+            return 0.0
+        ti = self._tis[n - 1]
+        total = 0.0
+        for hp in heads:
+            total += euclidean_distance(ti, self._tis[hp])
+        return float(total / len(heads))
+
+    def candidate_plan(self, label: str) -> CandidateHeadPlan:
+        """Like `candidate_head_plan`, reusing the reduced prefix instead of rebuilding it."""
+        if label not in _REGION:
+            raise ValueError(f"Unknown function label: {label!r}")
+        pos = len(self._labels)
+        labels = self._labels + [label]
+        distances = self._distances + [0.0]
+        nodes, lo = self._expand_with_leaf(pos, label)
+        lo = _reduce_slot_nodes(nodes, lo)
+
+        chain = self._spine_heads(nodes[-1])
+        contested: int | None = None
+        if len(nodes) > 1:
+            k = len(nodes) - 1
+            start = min(lo, k)
+            folded = self._fold_heads(nodes[:k], start, labels, distances)
+            acc = folded[-1] if folded else self._fold[start - 1]
+            if nodes[-1].head_pos != pos:
+                chain.append(_stable_head(acc, nodes[-1].head_pos, labels, distances))
+            else:
+                contested = acc
+
+        heads: list[int] = []
+        for hp in chain:
+            if hp != pos and (not heads or heads[-1] != hp):
+                heads.append(hp)
+        if contested is not None and heads and heads[-1] == contested:
+            contested = None
+        return CandidateHeadPlan(label=label, heads=tuple(heads), contested=contested)
+
+    def candidate_tension(
+        self, cand_tis: np.ndarray, cand_labels: np.ndarray, cand_distances: np.ndarray
+    ) -> np.ndarray:
+        """`hierarchical_tension_candidates` against the current progression."""
+        if not self._labels:
+            return np.zeros(np.asarray(cand_tis).shape[0], dtype=np.float64)
+        return evaluate_head_plans(
+            [self.candidate_plan(label) for label in FUNCTION_LABELS],
+            tis_list=self.tis,
+            func_labels=self._labels,
+            key_distances=self._distances,
+            cand_tis=cand_tis,
+            cand_labels=cand_labels,
+            cand_distances=cand_distances,
+        )
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from ..tis_index import COMPACT_KEY_IDS, TISIndex
+from ..tis_metrics import vectorized_angles
+from .hierarchy import FUNCTION_LABELS, harmonic_function_codes_from_tis
+from .theory import PC_TO_IDX, function_prototypes, key_tis
+
+
+NUM_KEYS = 24
+KEY_ROOT_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+
+def key_id(key_root: str, key_mode: str = "major") -> int:
+    """Dense key id in [0, 24): major keys 0..11, minor keys 12..23 (by root pitch class)."""
+    if key_root not in PC_TO_IDX:
+        raise ValueError(f"Unknown key root: {key_root!r}")
+    return PC_TO_IDX[key_root] + (0 if key_mode == "major" else 12)
+
+
+def key_from_id(kid: int) -> tuple[str, str]:
+    if kid < 0 or kid >= NUM_KEYS:
+        raise ValueError(f"Key id must be in [0, {NUM_KEYS}); got {kid}.")
+    return KEY_ROOT_NAMES[kid % 12], "major" if kid < 12 else "minor"
+
+
+@dataclass(frozen=True)
+class KeyFeatures:
+    """Previous-chord-independent features of every index row for one key."""
+
+    d2: np.ndarray  # (M,) float64; angle to the key TIS
+    d3: np.ndarray  # (M,) float64; min angle to the function prototypes (key-relative)
+    function_codes: np.ndarray  # (M,) int8; index into FUNCTION_LABELS
+
+    @property
+    def function_labels(self) -> np.ndarray:
+        """(M,) array of 't'/'s'/'d'."""
+        return np.asarray(FUNCTION_LABELS)[self.function_codes]
+
+    def function_label(self, row: int) -> str:
+        return FUNCTION_LABELS[int(self.function_codes[row])]
+
+
+def compute_key_features(
+    tis: np.ndarray, tis_unit: np.ndarray, key_root: str, key_mode: str = "major"
+) -> KeyFeatures:
+    """Compute d2, d3 and function labels for an (M,6) TIS matrix in one key."""
+    d2, d3 = compute_key_angles(tis, tis_unit, key_root, key_mode)
+    codes = harmonic_function_codes_from_tis(tis, function_prototypes(key_root, key_mode))
+    return KeyFeatures(d2=d2, d3=d3, function_codes=codes)
+
+
+def compute_key_angles(
+    tis: np.ndarray, tis_unit: np.ndarray, key_root: str, key_mode: str = "major"
+) -> tuple[np.ndarray, np.ndarray]:
+    """d2 (angle to the key) and d3 (min angle to the function prototypes) for (M,6) TIS."""
+    k_tis = key_tis(key_root, key_mode)
+    d2 = vectorized_angles(tis_unit, k_tis)
+
+    protos = function_prototypes(key_root, key_mode)
+    offset = tis - k_tis[None, :]
+    offset_norm = np.sqrt(np.sum(np.abs(offset) ** 2, axis=1))
+    offset_unit = np.zeros_like(offset)
+    good = offset_norm > 0
+    offset_unit[good] = offset[good] / offset_norm[good, None]
+    d3 = np.full(tis.shape[0], np.inf, dtype=np.float64)
+    for proto in protos.values():
+        proto_off = proto - k_tis
+        d3 = np.minimum(d3, vectorized_angles(offset_unit, proto_off))
+    return d2, d3
+
+
+def build_key_feature_table(
+    tis: np.ndarray, *, key_ids: Sequence[int] = range(NUM_KEYS)
+) -> dict[str, np.ndarray]:
+    """Stack `compute_key_features` of an (M,6) TIS matrix for `key_ids` into (K,M) arrays."""
+    tis_unit = tis / np.sqrt(np.sum(np.abs(tis) ** 2, axis=1))[:, None]
+    per_key = [compute_key_features(tis, tis_unit, *key_from_id(kid)) for kid in key_ids]
+    return {
+        "key_d2": np.stack([kf.d2 for kf in per_key]),
+        "key_d3": np.stack([kf.d3 for kf in per_key]),
+        "key_function": np.stack([kf.function_codes for kf in per_key]),
+    }
+
+
+def key_features(index: TISIndex, key_root: str, key_mode: str = "major") -> KeyFeatures:
+    """Key features for `index`, read from its stored table or memoized per process.
+
+    Compact (C major / C minor) tables are transposed to the requested key by
+    gathering: a chord's features in key X equal those of the chord transposed
+    down to C in the same mode (see `TISIndex.closure_columns`).
+    The returned arrays are shared between calls and therefore read-only.
+    """
+    kid = key_id(key_root, key_mode)
+
+    def build() -> KeyFeatures:
+        if index.key_d2 is not None and index.key_d3 is not None and index.key_function is not None:
+            if index.key_d2.shape[0] == NUM_KEYS:
+                src, rows = kid, slice(None)
+            else:
+                src = COMPACT_KEY_IDS.index(12 * (kid // 12))
+                rows = index.closure_columns(-(kid % 12))
+            kf = KeyFeatures(
+                d2=np.asarray(index.key_d2[src][rows], dtype=np.float64),
+                d3=np.asarray(index.key_d3[src][rows], dtype=np.float64),
+                function_codes=np.asarray(index.key_function[src][rows], dtype=np.int8),
+            )
+        else:
+            kf = compute_key_features(index.tis, index.tis_unit, key_root, key_mode)
+        for arr in (kf.d2, kf.d3, kf.function_codes):
+            arr.setflags(write=False)
+        return kf
+
+    return index.memo(("key_features", kid), build)
@@ -0,0 +1,84 @@
+"""Multi-step lookahead: beam search over chord continuations.
+
+Each step scores every candidate after every path in the beam with one
+`compute_features_batch` call (per-key tables and, when the index stores it,
+the pairwise voice-leading matrix are gathered, not recomputed), so an
+expansion is a (B,M) array operation.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .features import compute_features_batch
+from .key_features import key_id
+from .model import compute_tension_batch, goal_sort_key, required_features
+
+
+def beam_search_progressions(
+    index: TISIndex,
+    start_row: int,
+    key_root: str,
+    key_mode: str = "major",
+    *,
+    steps: int = 4,
+    beam: int = 8,
+    weights: dict[str, float] | None = None,
+    goal: str = "resolve",
+    progression_rows: Sequence[int] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The best `beam` continuations of `steps` chords after `start_row`.
+
+    Every step's tension is that of `suggest_next_chords` for the path so far
+    (normalized over all candidates; hierarchical tension uses ``progression_rows``,
+    or the start chord, followed by the path). A path's score is the sum of its
+    steps' `goal_sort_key`, lower is better; a chord never follows itself.
+
+    Returns ``(paths, tension, score)``: (B,steps) rows, (B,steps) per-step
+    tension and (B,) scores, best first.
+    """
+    if steps < 1 or beam < 1:
+        raise ValueError("steps and beam must be >= 1.")
+    context = [int(r) for r in progression_rows] if progression_rows else [int(start_row)]
+    if context[-1] != start_row:
+        raise ValueError("progression_rows must end with start_row.")
+    want = required_features(weights)
+    kid = key_id(key_root, key_mode)
+    n = index.tis.shape[0]
+
+    paths = np.empty((1, 0), dtype=np.int64)
+    tension = np.empty((1, 0), dtype=np.float64)
+    score = np.zeros(1, dtype=np.float64)
+    for _ in range(steps):
+        q = paths.shape[0]
+        prev = paths[:, -1] if paths.shape[1] else np.full(q, start_row, dtype=np.int64)
+        feats = compute_features_batch(
+            index,
+            prev,
+            np.full(q, kid),
+            progression_rows=[context + p.tolist() for p in paths] if "h" in want else None,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=want,
+        )
+        step = compute_tension_batch(feats, weights=weights, normalize=normalize, shape=(q, n))
+        step[np.arange(q), prev] = np.nan
+        total = score[:, None] + goal_sort_key(step, goal)
+        total[np.isnan(total)] = np.inf
+
+        flat_total = total.ravel()
+        k = min(beam, int(np.count_nonzero(np.isfinite(flat_total))))
+        if k == 0:
+            break
+        best = np.argpartition(flat_total, k - 1)[:k]
+        # Kept entries sorted by score, ties by (path, candidate) for determinism.
+        best = best[np.lexsort((best, flat_total[best]))]
+        qi, cand = np.divmod(best, n)
+        paths = np.column_stack([paths[qi], cand])
+        tension = np.column_stack([tension[qi], step[qi, cand]])
+        score = flat_total[best]
+    return paths, tension, score
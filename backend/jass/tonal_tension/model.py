@@ -1,27 +1,70 @@
 from __future__ import annotations
 
-from typing import Sequence
+import time
+from typing import Collection, Mapping, Sequence
 
 import numpy as np
 
-from ..chroma_index import chroma_bits_to_notes, filter_slash_suggestions
+from ..chroma_index import chord_root_pc, chroma_bits_to_notes, filter_slash_suggestions
 from ..tis_index import TISIndex
-from .features import compute_features
+from .constraints import ChordConstraints
+from .features import (
+    FEATURE_NAMES,
+    cached_features,
+    compute_features,
+    compute_row_features,
+    feature_set,
+)
+from .topk import TopKTable
 from .weights import DEFAULT_WEIGHTS
 
 
+def required_features(
+    weights: Mapping[str, float] | None = None, extra: Collection[str] | None = None
+) -> frozenset[str]:
+    """Features needed to score `weights` (the non-zero ones) plus any `extra` for output."""
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    return feature_set([k for k, w in weights.items() if w]) | feature_set(extra or ())
+
+
+def _weighted_feature(features: Mapping[str, np.ndarray], key: str) -> np.ndarray:
+    if key not in features:
+        raise ValueError(f"Feature {key!r} has a non-zero weight but was not computed.")
+    return features[key]
+
+
+def _tension_shape(
+    features: Mapping[str, np.ndarray], shape: int | tuple[int, ...] | None
+) -> tuple[int, ...]:
+    """Shape of the tension array: the features', else `shape` (all weights zero)."""
+    if shape is not None:
+        return (shape,) if isinstance(shape, int) else tuple(shape)
+    if not features:
+        raise ValueError("No features computed (every weight is zero); pass the output size.")
+    return next(iter(features.values())).shape
+
+
 def compute_tension(
     features: dict[str, np.ndarray],
     *,
     weights: dict[str, float] | None = None,
     normalize: bool = True,
+    size: int | None = None,
 ) -> np.ndarray:
+    """Weighted sum of (optionally min-max normalized) features.
+
+    ``size`` gives the number of rows when ``features`` may be empty, i.e. every
+    weight is zero; the tension is then all zeros.
+    """
     if weights is None:
         weights = DEFAULT_WEIGHTS
 
-    tension = np.zeros_like(features["d1"])
+    tension = np.zeros(_tension_shape(features, size), dtype=np.float64)
     for key, w in weights.items():
-        vals = features[key]
+        if not w:
+            continue
+        vals = _weighted_feature(features, key)
         if normalize:
             vmin, vmax = float(np.nanmin(vals)), float(np.nanmax(vals))
             span = vmax - vmin
@@ -32,6 +75,228 @@ def compute_tension(
     return tension
 
 
+def rank_candidates(
+    features: dict[str, np.ndarray],
+    prev_row: int,
+    *,
+    weights: dict[str, float] | None = None,
+    goal: str = "resolve",
+    normalize: bool = True,
+    size: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Combine features into tension and order rows by `goal`; `prev_row` sorts last.
+
+    Returns ``(order, tension)`` where ``tension[prev_row]`` is NaN. ``size`` is
+    as for `compute_tension`.
+    """
+    tension = compute_tension(features, weights=weights, normalize=normalize, size=size)
+    tension[prev_row] = np.nan
+    return order_for_goal(tension, goal), tension
+
+
+def goal_sort_key(tension: np.ndarray, goal: str) -> np.ndarray:
+    """Ascending sort key for `goal`: tension, negated tension, or distance to a numeric target."""
+    try:
+        target = float(goal)
+        return np.abs(tension - target)
+    except (ValueError, TypeError):
+        return -tension if goal == "build" else tension
+
+
+def order_for_goal(tension: np.ndarray, goal: str) -> np.ndarray:
+    """Rows ordered by `goal`: low tension, high tension, or closeness to a numeric target."""
+    sort_key = goal_sort_key(tension, goal)
+    return np.argsort(np.where(np.isnan(sort_key), np.inf, sort_key))
+
+
+def feature_matrix(
+    features: dict[str, np.ndarray],
+    names: Sequence[str] = FEATURE_NAMES,
+    *,
+    normalize: bool = True,
+) -> np.ndarray:
+    """(F,M) stack of `names`, min-max normalized per feature as in `compute_tension`."""
+    rows = []
+    for name in names:
+        vals = np.asarray(_weighted_feature(features, name), dtype=np.float64)
+        if normalize:
+            vmin, vmax = float(np.nanmin(vals)), float(np.nanmax(vals))
+            span = vmax - vmin
+            vals = (vals - vmin) / span if span > 0 else np.zeros_like(vals)
+        rows.append(vals)
+    return np.stack(rows)
+
+
+def score_weight_profiles(
+    features: dict[str, np.ndarray],
+    profiles: Sequence[Mapping[str, float]],
+    *,
+    normalize: bool = True,
+    size: int | None = None,
+) -> np.ndarray:
+    """Tension of every row under W weight profiles at once: (W,F) @ (F,M) -> (W,M).
+
+    Only features with a non-zero weight in some profile (F <= 6) are used;
+    ``size`` is as for `compute_tension`.
+    """
+    weights = np.zeros((len(profiles), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, profile in enumerate(profiles):
+        for name, w in profile.items():
+            if name not in FEATURE_NAMES:
+                raise ValueError(f"Unknown feature {name!r} in weight profile.")
+            weights[i, FEATURE_NAMES.index(name)] = float(w)
+    used = np.flatnonzero(np.any(weights != 0, axis=0))
+    names = [FEATURE_NAMES[j] for j in used.tolist()]
+    if not names:
+        return np.zeros((len(profiles), *_tension_shape(features, size)), dtype=np.float64)
+    return weights[:, used] @ feature_matrix(features, names, normalize=normalize)
+
+
+def compute_tension_batch(
+    features: dict[str, np.ndarray],
+    *,
+    weights: dict[str, float] | None = None,
+    normalize: bool = True,
+    shape: tuple[int, int] | None = None,
+) -> np.ndarray:
+    """`compute_tension` for (Q,M) features, normalizing each query (row) separately.
+
+    ``shape`` gives (Q,M) when ``features`` may be empty (every weight zero).
+    """
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    tension = np.zeros(_tension_shape(features, shape), dtype=np.float64)
+    for key, w in weights.items():
+        if not w:
+            continue
+        vals = _weighted_feature(features, key)
+        if normalize:
+            vmin = np.nanmin(vals, axis=1, keepdims=True)
+            span = np.nanmax(vals, axis=1, keepdims=True) - vmin
+            normed = np.divide(vals - vmin, span, out=np.zeros_like(vals), where=span > 0)
+            tension += float(w) * normed
+        else:
+            tension += float(w) * vals
+    return tension
+
+
+def rank_candidates_batch(
+    features: dict[str, np.ndarray],
+    prev_rows: np.ndarray,
+    goals: Sequence[str],
+    top: int,
+    *,
+    weights: dict[str, float] | None = None,
+    normalize: bool = True,
+    shape: tuple[int, int] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """`rank_candidates` for (Q,M) features, keeping each query's best `top` rows.
+
+    Normalization is per query (row). Returns ``(rows, tension)``, both (Q,top),
+    using `argpartition` so only the kept rows are sorted; exactly tied
+    candidates may therefore come out in a different order than `rank_candidates`.
+    ``shape`` is as for `compute_tension_batch`.
+    """
+    tension = compute_tension_batch(
+        features, weights=weights, normalize=normalize, shape=shape
+    )
+    q, n = tension.shape
+    tension[np.arange(q), prev_rows] = np.nan
+
+    sort_key = np.empty_like(tension)
+    for i, goal in enumerate(goals):
+        sort_key[i] = goal_sort_key(tension[i], goal)
+    sort_key[np.isnan(sort_key)] = np.inf
+
+    top = max(0, min(top, n - 1))
+    if top:
+        part = np.argpartition(sort_key, top - 1, axis=1)[:, :top]
+    else:
+        part = np.empty((q, 0), dtype=np.int64)
+    part_keys = np.take_along_axis(sort_key, part, axis=1)
+    rows = np.take_along_axis(part, np.argsort(part_keys, axis=1), axis=1)
+    return rows, np.take_along_axis(tension, rows, axis=1)
+
+
+def _has_root(name: str, roots: int) -> bool:
+    """Whether chord `name` has a root pitch class in the 12-bit mask `roots`."""
+    pc = chord_root_pc(name)
+    return pc is not None and bool(roots >> pc & 1)
+
+
+def format_suggestions(
+    index: TISIndex,
+    order: Sequence[int],
+    features: dict[str, np.ndarray],
+    tension: np.ndarray,
+    *,
+    roots: int | None = None,
+) -> list[dict]:
+    """Result dicts (1-based rank) for the rows in `order`.
+
+    Features missing from `features` or NaN for a row (not computed) are left out
+    of the dicts, so every result is valid JSON. With ``roots`` (a 12-bit mask of
+    root pitch classes, see `ChordConstraints.root_bits`) representatives with
+    one of these roots are listed, and so displayed, first.
+    """
+    present = [name for name in FEATURE_NAMES if name in features]
+    results: list[dict] = []
+    for rank, idx_i in enumerate(order):
+        i = int(idx_i)
+        reps_all = index.reps_for_row(i)
+        reps = filter_slash_suggestions(reps_all)
+        if roots is not None:
+            reps.sort(key=lambda name: not _has_root(name, roots))
+        notes = chroma_bits_to_notes(index.chroma_bits[i].tolist())
+        result = {
+            "row": i,
+            "rank": rank + 1,
+            "name": reps[0] if reps else str(index.rep_names[i]),
+            "reps": reps,
+            "notes": notes,
+        }
+        for name in present:
+            value = float(features[name][i])
+            if not np.isnan(value):
+                result[name] = value
+        result["tension"] = float(tension[i])
+        results.append(result)
+    return results
+
+
+def _expand_rows(
+    n: int, rows: np.ndarray, row_feats: dict[str, np.ndarray], row_tension: np.ndarray
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Scatter features/tension of `rows` into length-`n` arrays, NaN elsewhere."""
+    feats = {name: np.full(n, np.nan) for name in row_feats}
+    for name, vals in row_feats.items():
+        feats[name][rows] = vals
+    tension = np.full(n, np.nan)
+    tension[rows] = row_tension
+    return feats, tension
+
+
+def resolve_query_rows(
+    index: TISIndex, prev_chord: str, progression: Sequence[str] | None = None
+) -> tuple[int, list[int] | None]:
+    """Rows for a suggestion query's chord and optional progression ending in it."""
+    prev_row = index.row_for_name(prev_chord)
+    if prev_row is None:
+        raise ValueError(f"Chord {prev_chord!r} not found in index.")
+
+    progression_rows: list[int] | None = None
+    if progression:
+        resolved = index.rows_for_names(list(progression))
+        missing = np.flatnonzero(resolved < 0)
+        if missing.shape[0]:
+            name = progression[int(missing[0])]
+            raise ValueError(f"Chord {name!r} in progression not found in index.")
+        progression_rows = [int(r) for r in resolved]
+        if progression_rows and progression_rows[-1] != prev_row:
+            raise ValueError("progression must end with prev_chord.")
+    return prev_row, progression_rows
+
+
 def suggest_next_chords(
     index: TISIndex,
     prev_chord: str,
@@ -44,21 +309,72 @@ def suggest_next_chords(
     progression: Sequence[str] | None = None,
     normalize: bool = True,
     voice_leading_addition_penalty: int = 4,
+    topk: TopKTable | None = None,
+    features: Collection[str] | None = None,
+    constraints: ChordConstraints | None = None,
 ) -> list[dict]:
-    name_to_row = index.build_name_to_row()
-    if prev_chord not in name_to_row:
-        raise ValueError(f"Chord {prev_chord!r} not found in index.")
+    """Ranked suggestion dicts after `prev_chord` (and optional `progression` ending in it).
 
-    prev_row = name_to_row[prev_chord]
-    progression_rows: list[int] | None = None
-    if progression:
-        progression_rows = []
-        for name in progression:
-            if name not in name_to_row:
-                raise ValueError(f"Chord {name!r} in progression not found in index.")
-            progression_rows.append(name_to_row[name])
-        if progression_rows and progression_rows[-1] != prev_row:
-            raise ValueError("progression must end with prev_chord.")
+    Only features with a non-zero weight, plus any listed in ``features``, are
+    computed and reported. Single-chord queries with default weights are served
+    from `topk` (see `jass.tonal_tension.topk`) when given; features are then
+    computed for the returned rows only. With ``constraints``, features are
+    computed (and min-max normalized) over the allowed rows only.
+    """
+    want = required_features(weights, features)
+    prev_row, progression_rows = resolve_query_rows(index, prev_chord, progression)
+    if (
+        topk is not None
+        and constraints is None
+        and not progression_rows
+        and topk.serves(
+            index,
+            goal=goal,
+            top=top,
+            weights=weights,
+            normalize=normalize,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+        )
+    ):
+        rows, tension_top = topk.lookup(prev_row, key_root, key_mode, goal)
+        rows = rows[:top]
+        row_feats = compute_row_features(
+            index,
+            prev_row,
+            rows,
+            key_root,
+            key_mode,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=want,
+        )
+        feats, tension = _expand_rows(
+            index.tis.shape[0], rows, row_feats, tension_top[: rows.shape[0]]
+        )
+        return format_suggestions(index, rows, feats, tension)
+
+    if constraints is not None:
+        allowed = constraints.rows(index, key_root, key_mode)
+        allowed = allowed[allowed != prev_row]
+        if allowed.shape[0] == 0:
+            return []
+        row_feats = compute_row_features(
+            index,
+            prev_row,
+            allowed,
+            key_root,
+            key_mode,
+            progression_rows=progression_rows,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=want,
+        )
+        row_tension = compute_tension(
+            row_feats, weights=weights, normalize=normalize, size=allowed.shape[0]
+        )
+        order = allowed[order_for_goal(row_tension, goal)]
+        feats, tension = _expand_rows(index.tis.shape[0], allowed, row_feats, row_tension)
+        return format_suggestions(
+            index, order[:top], feats, tension, roots=constraints.root_bits()
+        )
 
     feats = compute_features(
         index,
@@ -67,38 +383,191 @@ def suggest_next_chords(
         key_mode,
         progression_rows=progression_rows,
         voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=want,
     )
-    tension = compute_tension(feats, weights=weights, normalize=normalize)
-    tension[prev_row] = np.nan
+    order, tension = rank_candidates(
+        feats,
+        prev_row,
+        weights=weights,
+        goal=goal,
+        normalize=normalize,
+        size=index.tis.shape[0],
+    )
+    return format_suggestions(index, order[:top], feats, tension)
 
-    try:
-        target = float(goal)
-        sort_key = np.abs(tension - target)
-    except (ValueError, TypeError):
-        sort_key = -tension if goal == "build" else tension
 
-    order = np.argsort(np.where(np.isnan(sort_key), np.inf, sort_key))
+# Features vectorized over all rows in well under a millisecond; m and h are not.
+CHEAP_FEATURES = frozenset({"d1", "d2", "d3", "c"})
 
-    results: list[dict] = []
-    for rank, idx_i in enumerate(order[:top]):
-        i = int(idx_i)
-        reps_all = index.reps_for_row(i)
-        reps = filter_slash_suggestions(reps_all)
-        notes = chroma_bits_to_notes(index.chroma_bits[i].tolist())
-        results.append(
-            {
-                "row": i,
-                "rank": rank + 1,
-                "name": reps[0] if reps else str(index.rep_names[i]),
-                "reps": reps,
-                "notes": notes,
-                "d1": float(feats["d1"][i]),
-                "d2": float(feats["d2"][i]),
-                "d3": float(feats["d3"][i]),
-                "c": float(feats["c"][i]),
-                "m": float(feats["m"][i]),
-                "h": float(feats["h"][i]),
-                "tension": float(tension[i]),
-            }
+# Candidates that get exact m/h in the second stage of `suggest_next_chords_anytime`.
+SHORTLIST_SIZE = 128
+
+# Refinement levels reported by `suggest_next_chords_anytime`, least refined first.
+REFINEMENT_LEVELS = ("coarse", "shortlist", "exact")
+
+
+def _mark_refinement(results: list[dict], refinement: str) -> tuple[list[dict], str]:
+    """Tag every result with the stage its features come from."""
+    for result in results:
+        result["refinement"] = refinement
+    return results, refinement
+
+
+def suggest_next_chords_anytime(
+    index: TISIndex,
+    prev_chord: str,
+    key_root: str,
+    key_mode: str = "major",
+    *,
+    deadline_ms: float | None = None,
+    shortlist: int = SHORTLIST_SIZE,
+    top: int = 10,
+    weights: dict[str, float] | None = None,
+    goal: str = "resolve",
+    progression: Sequence[str] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
+) -> tuple[list[dict], str]:
+    """`suggest_next_chords` in stages, returning the best ranking ready by ``deadline_ms``.
+
+    1. Every row is ranked on the cheap features (`CHEAP_FEATURES`), each weighted
+       m/h counting as its mid-range value. Past the deadline this is returned
+       as ``"coarse"``.
+    2. Exact m/h are computed for the best `shortlist` rows, normalized over the
+       shortlist, which is re-ranked (``"shortlist"``).
+    3. If the remaining rows fit the budget, judging by the time stage 2 took,
+       they are computed too and the result equals `suggest_next_chords`
+       (``"exact"``).
+
+    Returns ``(results, refinement)`` with refinement one of `REFINEMENT_LEVELS`,
+    also stored under ``"refinement"`` in every result; features not yet computed
+    for a row are left out of its result.
+    """
+    start = time.perf_counter()
+    deadline = np.inf if deadline_ms is None else start + float(deadline_ms) / 1000.0
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+    want = required_features(weights, features)
+    prev_row, progression_rows = resolve_query_rows(index, prev_chord, progression)
+    n = index.tis.shape[0]
+
+    feats = compute_features(
+        index,
+        prev_row,
+        key_root,
+        key_mode,
+        progression_rows=progression_rows,
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=want & CHEAP_FEATURES,
+    )
+    costly = sorted(want - CHEAP_FEATURES)
+    if not costly:
+        order, tension = rank_candidates(
+            feats, prev_row, weights=weights, goal=goal, normalize=normalize, size=n
         )
-    return results
+        return _mark_refinement(format_suggestions(index, order[:top], feats, tension), "exact")
+
+    cheap_weights = {k: w for k, w in weights.items() if k in CHEAP_FEATURES}
+    tension = compute_tension(feats, weights=cheap_weights, normalize=normalize, size=n)
+    if normalize:
+        tension += sum(0.5 * float(w) for k, w in weights.items() if k not in CHEAP_FEATURES)
+    tension[prev_row] = np.nan
+    order = order_for_goal(tension, goal)
+    for name in costly:
+        feats[name] = np.full(n, np.nan)
+    if time.perf_counter() >= deadline:
+        return _mark_refinement(format_suggestions(index, order[:top], feats, tension), "coarse")
+
+    def fill(rows: np.ndarray) -> None:
+        row_feats = compute_row_features(
+            index,
+            prev_row,
+            rows,
+            key_root,
+            key_mode,
+            progression_rows=progression_rows,
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+            features=costly,
+        )
+        for name, vals in row_feats.items():
+            feats[name][rows] = vals
+
+    first = order[: min(max(shortlist, top), n - 1)]
+    stage_start = time.perf_counter()
+    fill(first)
+    now = time.perf_counter()
+    rest = order[first.shape[0] :]
+    if now + (now - stage_start) * rest.shape[0] / max(first.shape[0], 1) <= deadline:
+        fill(rest)
+        order, tension = rank_candidates(
+            feats, prev_row, weights=weights, goal=goal, normalize=normalize, size=n
+        )
+        return _mark_refinement(format_suggestions(index, order[:top], feats, tension), "exact")
+
+    # Costly features normalized over the shortlist only (plus `prev_row`, whose
+    # m and h are 0 as in the exact range); other rows sort last.
+    short = np.full(n, np.nan)
+    short[first] = tension[first]
+    for name in costly:
+        vals = feats[name][first]
+        if normalize:
+            vmin, vmax = min(float(np.min(vals)), 0.0), float(np.max(vals))
+            span = vmax - vmin
+            vals = (vals - vmin) / span if span > 0 else np.zeros_like(vals)
+            short[first] += float(weights.get(name, 0.0)) * (vals - 0.5)
+        else:
+            short[first] += float(weights.get(name, 0.0)) * vals
+    short[prev_row] = np.nan
+    order = order_for_goal(short, goal)
+    return _mark_refinement(format_suggestions(index, order[:top], feats, short), "shortlist")
+
+
+def suggest_for_profiles(
+    index: TISIndex,
+    prev_chord: str,
+    key_root: str,
+    key_mode: str = "major",
+    *,
+    profiles: Mapping[str, Mapping[str, float]],
+    goals: Sequence[str] = ("resolve",),
+    top: int = 10,
+    progression: Sequence[str] | None = None,
+    normalize: bool = True,
+    voice_leading_addition_penalty: int = 4,
+    features: Collection[str] | None = None,
+) -> dict[str, dict[str, list[dict]]]:
+    """Suggestions for several weight profiles and goals from one feature pass.
+
+    Features (those weighted by any profile, plus ``features``) come from
+    `cached_features`; all profiles are scored by one `score_weight_profiles`
+    product and each goal only re-sorts. Returns ``{profile: {goal: results}}``.
+    """
+    want = frozenset().union(*(required_features(p) for p in profiles.values()))
+    want |= feature_set(features or ())
+    prev_row, progression_rows = resolve_query_rows(index, prev_chord, progression)
+    feats = cached_features(
+        index,
+        prev_row,
+        key_root,
+        key_mode,
+        progression_rows=progression_rows,
+        voice_leading_addition_penalty=voice_leading_addition_penalty,
+        features=want,
+    )
+    names = list(profiles)
+    scores = score_weight_profiles(
+        feats,
+        [profiles[n] for n in names],
+        normalize=normalize,
+        size=index.tis.shape[0],
+    )
+    scores[:, prev_row] = np.nan
+
+    out: dict[str, dict[str, list[dict]]] = {}
+    for name, tension in zip(names, scores):
+        out[name] = {
+            goal: format_suggestions(index, order_for_goal(tension, goal)[:top], feats, tension)
+            for goal in goals
+        }
+    return out
@@ -0,0 +1,158 @@
+"""Static tension features for all 4096 pitch-class sets.
+
+`c`, `d2` and `d3` depend only on a chord's chroma (and the key), not on the
+previous chord, so they can be tabulated once for every 12-bit mask. A live
+chroma frame, indexed or not, then gets its static tension by a table gather
+instead of a DFT and angle math per frame.
+"""
+
+from __future__ import annotations
+
+import json
+import zipfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Sequence
+
+import numpy as np
+
+from ..chroma_index import CHROMA_LEN, NUM_MASKS, ChromaInputError
+from ..tis_index import DEFAULT_WEIGHTS, atomic_write, chroma_matrix_to_masks, chroma_matrix_to_tis
+from .dissonance import dissonance_tension_from_tis_norm
+from .key_features import NUM_KEYS, compute_key_angles, key_from_id, key_id
+
+
+PCSET_TABLE_PATH = Path(__file__).resolve().parent.parent / "pcset_table.npz"
+
+
+@dataclass(frozen=True)
+class PitchClassSetTable:
+    """TIS and static tension features indexed by 12-bit chroma mask (row 0 = silence, NaN)."""
+
+    tis: np.ndarray  # (4096,6) complex128
+    tis_norm: np.ndarray  # (4096,) float64
+    c: np.ndarray  # (4096,) float64; dissonance tension
+    key_d2: np.ndarray  # (24,4096) float64; angle to each key
+    key_d3: np.ndarray  # (24,4096) float64; min angle to each key's function prototypes
+    meta: Mapping[str, object]
+
+    def features(
+        self, masks: Sequence[int] | np.ndarray, key_root: str, key_mode: str = "major"
+    ) -> dict[str, np.ndarray]:
+        """c, d2 and d3 for many masks in one key."""
+        masks_arr = np.asarray(masks, dtype=np.int64)
+        if np.any((masks_arr < 0) | (masks_arr >= NUM_MASKS)):
+            raise ChromaInputError(f"Masks must be in [0, {NUM_MASKS}).")
+        kid = key_id(key_root, key_mode)
+        return {
+            "d2": self.key_d2[kid, masks_arr],
+            "d3": self.key_d3[kid, masks_arr],
+            "c": self.c[masks_arr],
+        }
+
+    def features_for_chroma(
+        self,
+        chroma_bits: np.ndarray | Sequence[int] | Sequence[Sequence[int]],
+        key_root: str,
+        key_mode: str = "major",
+    ) -> dict[str, np.ndarray]:
+        """Like `features` for a (12,) frame or an (N,12) batch of 0/1 chroma frames."""
+        bits = np.asarray(chroma_bits)
+        if bits.ndim == 1:
+            feats = self.features(chroma_matrix_to_masks(bits[None, :]), key_root, key_mode)
+            return {k: v[0] for k, v in feats.items()}
+        return self.features(chroma_matrix_to_masks(bits), key_root, key_mode)
+
+    def to_npz(self, path: Path) -> None:
+        with atomic_write(path) as f:
+            np.savez_compressed(
+                f,
+                tis=self.tis,
+                tis_norm=self.tis_norm,
+                c=self.c,
+                key_d2=self.key_d2,
+                key_d3=self.key_d3,
+                meta=np.array(json.dumps(self.meta)),
+            )
+
+    @staticmethod
+    def from_npz(path: Path) -> "PitchClassSetTable":
+        with np.load(path, allow_pickle=False) as data:
+            return PitchClassSetTable(
+                tis=data["tis"],
+                tis_norm=data["tis_norm"],
+                c=data["c"],
+                key_d2=data["key_d2"],
+                key_d3=data["key_d3"],
+                meta=json.loads(str(data["meta"])),
+            )
+
+
+def build_pcset_table(*, weights: np.ndarray = DEFAULT_WEIGHTS) -> PitchClassSetTable:
+    weights = np.asarray(weights, dtype=np.float64)
+    masks = np.arange(1, NUM_MASKS, dtype=np.int64)
+    bits = ((masks[:, None] >> np.arange(CHROMA_LEN)) & 1).astype(np.float64)
+
+    tis = np.full((NUM_MASKS, weights.shape[0]), np.nan, dtype=np.complex128)
+    tis[1:] = chroma_matrix_to_tis(bits, weights=weights)
+    tis_norm = np.full(NUM_MASKS, np.nan, dtype=np.float64)
+    tis_norm[1:] = np.sqrt(np.sum(np.abs(tis[1:]) ** 2, axis=1))
+    tis_unit = tis[1:] / tis_norm[1:, None]
+
+    key_d2 = np.full((NUM_KEYS, NUM_MASKS), np.nan, dtype=np.float64)
+    key_d3 = np.full((NUM_KEYS, NUM_MASKS), np.nan, dtype=np.float64)
+    for kid in range(NUM_KEYS):
+        key_d2[kid, 1:], key_d3[kid, 1:] = compute_key_angles(
+            tis[1:], tis_unit, *key_from_id(kid)
+        )
+
+    return PitchClassSetTable(
+        tis=tis,
+        tis_norm=tis_norm,
+        c=dissonance_tension_from_tis_norm(tis_norm),
+        key_d2=key_d2,
+        key_d3=key_d3,
+        meta={"weights": [float(x) for x in weights.tolist()]},
+    )
+
+
+# Errors from reading a missing, partly written or otherwise unusable cache file.
+_CACHE_READ_ERRORS = (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile, zlib.error)
+
+_TABLES: dict[tuple[str, tuple[float, ...]], PitchClassSetTable] = {}
+
+
+def load_pcset_table(
+    path: Path | None = None, *, weights: np.ndarray = DEFAULT_WEIGHTS
+) -> PitchClassSetTable:
+    """The pitch-class-set table, built on first use and cached on disk and per process.
+
+    The on-disk cache (``jass/pcset_table.npz`` by default) is rebuilt when it was
+    made with different TIS weights or cannot be read; it is replaced atomically,
+    so concurrent workers never read a partial file, and failing to write it is
+    not an error.
+    """
+    path = PCSET_TABLE_PATH if path is None else Path(path)
+    wkey = tuple(float(x) for x in np.asarray(weights, dtype=np.float64).tolist())
+    cache_key = (str(path), wkey)
+    table = _TABLES.get(cache_key)
+    if table is not None:
+        return table
+
+    try:
+        table = PitchClassSetTable.from_npz(path)
+    except _CACHE_READ_ERRORS:
+        table = None
+    if table is not None and tuple(table.meta.get("weights", ())) != wkey:
+        table = None
+    if table is None:
+        table = build_pcset_table(weights=weights)
+        try:
+            table.to_npz(path)
+        except OSError:
+            pass
+    for arr in (table.tis, table.tis_norm, table.c, table.key_d2, table.key_d3):
+        arr.setflags(write=False)
+    _TABLES[cache_key] = table
+    return table
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .hierarchy import IncrementalHierarchy
+from .key_features import key_features
+
+
+class ProgressionTree:
+    """Live hierarchical-tension state for a progression of index rows in one key.
+
+    Rows are appended one at a time; the merged tree prefix is reused instead of
+    being rebuilt per query. ``window`` caps the context to the last N chords.
+    """
+
+    def __init__(
+        self,
+        index: TISIndex,
+        key_root: str,
+        key_mode: str = "major",
+        *,
+        window: int | None = None,
+        rows: Iterable[int] = (),
+    ):
+        self.index = index
+        self.key_root = key_root
+        self.key_mode = key_mode
+        self._kf = key_features(index, key_root, key_mode)
+        self._hier = IncrementalHierarchy(window=window)
+        self._rows: deque[int] = deque(maxlen=window)
+        self.extend(rows)
+
+    @property
+    def window(self) -> int | None:
+        return self._hier.window
+
+    @property
+    def rows(self) -> list[int]:
+        """Rows currently in context (the last ``window`` appended, if capped)."""
+        return list(self._rows)
+
+    @property
+    def last_row(self) -> int | None:
+        return self._rows[-1] if self._rows else None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def append(self, row: int) -> None:
+        row = int(row)
+        n = self.index.tis.shape[0]
+        if row < 0 or row >= n:
+            raise IndexError(f"Row {row} out of range for index with {n} rows.")
+        kf = self._kf
+        self._hier.append(self.index.tis[row], kf.function_label(row), float(kf.d2[row]))
+        self._rows.append(row)
+
+    def extend(self, rows: Iterable[int]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def clear(self) -> None:
+        self._hier.clear()
+        self._rows.clear()
+
+    def last_tension(self) -> float:
+        """Hierarchical tension h of the most recent chord within its context."""
+        return self._hier.last_tension()
+
+    def candidate_tension(self) -> np.ndarray:
+        """(M,) hierarchical tension of every index row appended next; 0 for the last row."""
+        h = self._hier.candidate_tension(self.index.tis, self._kf.function_labels, self._kf.d2)
+        if self._rows:
+            h[self._rows[-1]] = 0.0
+        return h
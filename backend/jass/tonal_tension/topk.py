@@ -0,0 +1,194 @@
+"""Offline top-k suggestion tables for single-chord queries.
+
+Without progression context a suggestion depends only on (chord row, key,
+goal, weights), so for the default weights the ranked candidates of every
+chord in every key can be precomputed. The table is CSR-style: entry
+``(key_id, goal, row)`` owns ``rows[indptr[e]:indptr[e + 1]]`` and the matching
+``tension`` values, best first. Build it with::
+
+    python -m jass.tonal_tension.topk --out jass/topk_table.npz --k 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping
+
+import numpy as np
+
+from ..tis_index import TISIndex
+from .features import compute_features
+from .key_features import NUM_KEYS, key_features, key_from_id, key_id
+from .weights import DEFAULT_WEIGHTS
+
+
+TOPK_GOALS = ("resolve", "build")
+
+
+def index_digest(index: TISIndex) -> str:
+    """Fingerprint of an index's row order (its chroma masks); tables are only valid for it."""
+
+    def build() -> str:
+        data = np.ascontiguousarray(np.asarray(index.chroma_mask, dtype=np.uint16))
+        return hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+
+    return index.memo("index_digest", build)
+
+
+@dataclass(frozen=True)
+class TopKTable:
+    indptr: np.ndarray  # (24*G*M+1,) int64
+    rows: np.ndarray  # (nnz,) int32; candidate rows, best first
+    tension: np.ndarray  # (nnz,) float64; normalized default-weight tension
+    meta: Mapping[str, object]
+
+    @property
+    def k(self) -> int:
+        return int(self.meta["k"])
+
+    @property
+    def goals(self) -> tuple[str, ...]:
+        return tuple(self.meta["goals"])
+
+    def _entry(self, row: int, kid: int, goal: str) -> int:
+        m = int(self.meta["num_vectors"])
+        return (kid * len(self.goals) + self.goals.index(goal)) * m + row
+
+    def serves(
+        self,
+        index: TISIndex,
+        *,
+        goal: str,
+        top: int,
+        weights: Mapping[str, float] | None,
+        normalize: bool,
+        voice_leading_addition_penalty: int,
+    ) -> bool:
+        """True if a query with these options can be answered from the table."""
+        return (
+            normalize
+            and (weights is None or dict(weights) == dict(self.meta["weights"]))
+            and goal in self.goals
+            and top <= self.k
+            and voice_leading_addition_penalty == self.meta["voice_leading_addition_penalty"]
+            and self.meta["index_digest"] == index_digest(index)
+        )
+
+    def lookup(
+        self, row: int, key_root: str, key_mode: str, goal: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """``(rows, tension)`` of the ranked candidates after `row`."""
+        e = self._entry(row, key_id(key_root, key_mode), goal)
+        start, end = int(self.indptr[e]), int(self.indptr[e + 1])
+        return self.rows[start:end], self.tension[start:end]
+
+    def to_npz(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            indptr=self.indptr,
+            rows=self.rows,
+            tension=self.tension,
+            meta_json=np.array(json.dumps(dict(self.meta), sort_keys=True)),
+        )
+
+    @staticmethod
+    def from_npz(path: Path) -> "TopKTable":
+        with np.load(path, allow_pickle=False) as data:
+            return TopKTable(
+                indptr=data["indptr"],
+                rows=data["rows"],
+                tension=data["tension"],
+                meta=json.loads(str(data["meta_json"])),
+            )
+
+
+def build_topk_table(
+    index: TISIndex,
+    *,
+    k: int = 32,
+    goals: tuple[str, ...] = TOPK_GOALS,
+    voice_leading_addition_penalty: int = 4,
+) -> TopKTable:
+    """Rank every (key, goal, chord) with `rank_candidates` and keep the best `k`."""
+    # Local import: model imports this module for its fast path.
+    from .model import rank_candidates
+
+    n = index.tis.shape[0]
+    kk = min(k, n - 1)
+    rows = np.zeros((NUM_KEYS, len(goals), n, kk), dtype=np.int32)
+    tension = np.zeros((NUM_KEYS, len(goals), n, kk), dtype=np.float64)
+    per_key = [key_features(index, *key_from_id(kid)) for kid in range(NUM_KEYS)]
+    for prev_row in range(n):
+        # Without progression context only d2/d3 depend on the key.
+        base = compute_features(
+            index,
+            prev_row,
+            *key_from_id(0),
+            voice_leading_addition_penalty=voice_leading_addition_penalty,
+        )
+        for kid, kf in enumerate(per_key):
+            feats = dict(base, d2=kf.d2, d3=kf.d3)
+            for g, goal in enumerate(goals):
+                order, t = rank_candidates(feats, prev_row, goal=goal)
+                rows[kid, g, prev_row] = order[:kk]
+                tension[kid, g, prev_row] = t[order[:kk]]
+
+    entries = NUM_KEYS * len(goals) * n
+    meta = {
+        "k": kk,
+        "goals": list(goals),
+        "weights": dict(DEFAULT_WEIGHTS),
+        "num_vectors": n,
+        "index_digest": index_digest(index),
+        "voice_leading_addition_penalty": int(voice_leading_addition_penalty),
+    }
+    return TopKTable(
+        indptr=np.arange(entries + 1, dtype=np.int64) * kk,
+        rows=rows.reshape(-1),
+        tension=tension.reshape(-1),
+        meta=meta,
+    )
+
+
+_TABLES: dict[tuple[str, int, int], TopKTable] = {}
+
+
+def load_topk_table(path: str | Path) -> TopKTable:
+    """Load a table once per process (keyed by resolved path, mtime and size)."""
+    resolved = Path(path).resolve()
+    st = resolved.stat()
+    cache_key = (str(resolved), st.st_mtime_ns, st.st_size)
+    table = _TABLES.get(cache_key)
+    if table is None:
+        table = TopKTable.from_npz(resolved)
+        for arr in (table.indptr, table.rows, table.tension):
+            arr.setflags(write=False)
+        _TABLES[cache_key] = table
+    return table
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build an offline top-k suggestion table.")
+    parser.add_argument(
+        "--index", type=Path, default=Path(__file__).resolve().parent.parent / "tis_index.npz"
+    )
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--voice-leading-addition-penalty", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    table = build_topk_table(
+        TISIndex.load(args.index),
+        k=args.k,
+        voice_leading_addition_penalty=args.voice_leading_addition_penalty,
+    )
+    table.to_npz(args.out)
+    print(f"wrote {args.out}: {table.rows.shape[0]} entries, k={table.k}")
+
+
+if __name__ == "__main__":
+    main()
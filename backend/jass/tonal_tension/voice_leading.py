@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import itertools
+from functools import lru_cache
 from typing import Sequence
 
 import numpy as np
 
 from ..tis_index import chroma_bits_to_tis, euclidean_distance
 
+try:
+    from scipy.optimize import linear_sum_assignment  # type: ignore[import-untyped]
+except ImportError:
+    linear_sum_assignment = None
+
 
 PC_DIST = np.zeros((12, 12), dtype=np.int32)
 for _i in range(12):
@@ -26,6 +32,15 @@ for _pc in range(12):
     NOTE_TIS.append(chroma_bits_to_tis(_bits))
 NOTE_TIS_NORM = float(np.sqrt(np.sum(np.abs(NOTE_TIS[0]) ** 2)))
 
+# Per pitch-class pair cost s * mu used by the assignment in Eq. (8).
+PAIR_COST = np.zeros((12, 12), dtype=np.float64)
+for _i in range(12):
+    for _j in range(12):
+        PAIR_COST[_i, _j] = float(PC_DIST[_i, _j]) * euclidean_distance(NOTE_TIS[_i], NOTE_TIS[_j])
+
+# Largest padded set size solved by exhaustive permutation (8! = 40320 candidates).
+MAX_PERMUTATION_SIZE = 8
+
 
 def voice_leading_tension(
     bits_a: Sequence[int],
@@ -52,13 +67,11 @@ def voice_leading_tension(
             mu = euclidean_distance(NOTE_TIS[pcs_a[i]], NOTE_TIS[pcs_b[j]])
             cost[i, j] = s * mu
 
-    try:
-        from scipy.optimize import linear_sum_assignment  # type: ignore[import-untyped]
-
+    if linear_sum_assignment is not None:
         row_ind, col_ind = linear_sum_assignment(cost)
         chosen = cost[row_ind, col_ind]
-    except ImportError:
-        if n <= 8:
+    else:
+        if n <= MAX_PERMUTATION_SIZE:
             best = None
             for perm in itertools.permutations(range(n)):
                 total = sum(cost[i, perm[i]] for i in range(n))
@@ -82,3 +95,89 @@ def voice_leading_tension(
 
     stability = float(np.sum(np.exp(-0.05 * chosen)))
     return -stability
+
+
+@lru_cache(maxsize=None)
+def _permutations(n: int) -> np.ndarray:
+    """All permutations of range(n) as a (n!, n) index array, in `itertools` order."""
+    return np.array(list(itertools.permutations(range(n))), dtype=np.intp).reshape(-1, n)
+
+
+def voice_leading_tension_batch(
+    bits_a: Sequence[int],
+    candidates_bits: np.ndarray,
+    *,
+    addition_penalty: int = 4,
+) -> np.ndarray:
+    """`voice_leading_tension` from one chord to each row of an (N,12) chroma matrix.
+
+    Candidates are grouped by cardinality and every assignment is scored at once
+    against a precomputed permutation index tensor, so no scipy is needed. Ties
+    resolve to the first permutation in `itertools` order, matching the
+    exhaustive fallback of `voice_leading_tension`.
+    """
+    candidates = np.asarray(candidates_bits)
+    if candidates.ndim != 2 or candidates.shape[1] != 12:
+        raise ValueError(f"Expected candidates_bits of shape (N,12); got {candidates.shape}.")
+
+    out = np.zeros(candidates.shape[0], dtype=np.float64)
+    pcs_a = np.flatnonzero(np.asarray(bits_a))
+    na = int(pcs_a.shape[0])
+    if na == 0:
+        return out
+
+    pad = addition_penalty * NOTE_TIS_NORM
+    cost_a = PAIR_COST[pcs_a]  # (na,12)
+    active = candidates != 0
+    counts = active.sum(axis=1)
+    for nb in np.unique(counts).tolist():
+        if nb == 0:
+            continue
+        sel = np.flatnonzero(counts == nb)
+        n = max(na, nb)
+        if n > MAX_PERMUTATION_SIZE:
+            for i in sel.tolist():
+                out[i] = voice_leading_tension(
+                    bits_a, candidates[i].tolist(), addition_penalty=addition_penalty
+                )
+            continue
+
+        g = sel.shape[0]
+        pcs_b = np.nonzero(active[sel])[1].reshape(g, nb)
+        cost = np.full((g, n, n), pad, dtype=np.float64)
+        cost[:, :na, :nb] = cost_a[:, pcs_b].transpose(1, 0, 2)
+
+        perms = _permutations(n)
+        totals = cost[:, 0, perms[:, 0]]
+        for i in range(1, n):
+            totals = totals + cost[:, i, perms[:, i]]
+        best = perms[np.argmin(totals, axis=1)]  # (g,n)
+        chosen = cost[np.arange(g)[:, None], np.arange(n)[None, :], best]
+        out[sel] = -np.sum(np.exp(-0.05 * chosen), axis=1)
+    return out
+
+
+def voice_leading_matrix(
+    chroma_bits: np.ndarray,
+    *,
+    addition_penalty: int = 4,
+    rows: Sequence[int] | np.ndarray | None = None,
+) -> np.ndarray:
+    """Pairwise `voice_leading_tension` for every pair of rows of an (M,12) chroma matrix.
+
+    Returns an (M,M) float32 matrix where entry [i, j] is the tension of moving
+    from chord i to chord j. With ``rows``, only those source rows are computed
+    and the result is (len(rows), M).
+    """
+    chroma_bits = np.asarray(chroma_bits)
+    if chroma_bits.ndim != 2 or chroma_bits.shape[1] != 12:
+        raise ValueError(f"Expected chroma_bits of shape (M,12); got {chroma_bits.shape}.")
+    n = chroma_bits.shape[0]
+    sources = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64).ravel()
+    out = np.zeros((sources.shape[0], n), dtype=np.float32)
+    for i, src in enumerate(sources.tolist()):
+        out[i] = voice_leading_tension_batch(
+            chroma_bits[src], chroma_bits, addition_penalty=addition_penalty
+        )
+        out[i, src] = 0.0
+    return out
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jass.tis_index import TISIndex, build_tis_index  # noqa: E402
+
+INDEX_PATH = Path(__file__).resolve().parent.parent / "jass" / "tis_index.npz"
+
+
+@pytest.fixture(scope="session")
+def shipped_index() -> TISIndex:
+    return TISIndex.load(INDEX_PATH)
+
+
+@pytest.fixture(scope="session")
+def chords_to_bits(shipped_index: TISIndex) -> dict[str, list[int]]:
+    out: dict[str, list[int]] = {}
+    for row in range(shipped_index.tis.shape[0]):
+        bits = [int(x) for x in shipped_index.chroma_bits[row]]
+        for name in shipped_index.aliases_for_row(row):
+            out[name] = bits
+    return out
+
+
+@pytest.fixture(scope="session")
+def full_key_index(chords_to_bits: dict[str, list[int]]) -> TISIndex:
+    return build_tis_index(chords_to_bits, precompute_key_features=True)
+
+
+@pytest.fixture(scope="session")
+def compact_key_index(chords_to_bits: dict[str, list[int]]) -> TISIndex:
+    return build_tis_index(
+        chords_to_bits, precompute_key_features=True, compact_transpositions=True
+    )
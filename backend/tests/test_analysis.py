@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from jass.tis_index import TISIndex
+from jass.tonal_tension.analysis import analyze_progression, progression_rows_for
+from jass.tonal_tension.features import FEATURE_NAMES, compute_features
+
+
+def test_features_match_compute_features_with_repeats(shipped_index: TISIndex) -> None:
+    progression = ["G7", "C", "F", "F", "Dm7", "G7", "G7", "C"]
+    rows = progression_rows_for(shipped_index, progression)
+    feats, _ = analyze_progression(shipped_index, progression, "C")
+    for i in range(1, len(progression)):
+        expected = compute_features(
+            shipped_index,
+            int(rows[i - 1]),
+            "C",
+            "major",
+            progression_rows=rows[:i].tolist(),
+            features=FEATURE_NAMES,
+        )
+        for j, name in enumerate(FEATURE_NAMES):
+            assert feats[i, j] == pytest.approx(expected[name][rows[i]], abs=1e-9), (i, name)
+    assert feats[3, FEATURE_NAMES.index("h")] == 0.0
+    assert np.all(feats[[3, 6]][:, [FEATURE_NAMES.index(n) for n in ("d1", "m")]] == 0.0)
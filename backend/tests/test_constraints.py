@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+from jass.chord_suggestion import suggest_chords
+from jass.chroma_index import chord_root_pc
+from jass.tonal_tension.theory import PC_TO_IDX
+
+
+@pytest.mark.parametrize("roots", [["C"], ["C", "F"], ["F#"]])
+def test_roots_constraint_matches_displayed_names(roots: list[str]) -> None:
+    out = suggest_chords(chord="G7", key="C", top=2000, constraints={"roots": roots})
+    assert out["results"]
+    allowed = {PC_TO_IDX[r] for r in roots}
+    for result in out["results"]:
+        assert chord_root_pc(result["name"]) in allowed, result["name"]
+        assert result["name"] in result["representatives"]
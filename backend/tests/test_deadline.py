@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from jass.chord_suggestion import suggest_chords
+
+
+@pytest.mark.parametrize(("deadline_ms", "refinement"), [(0.0, "coarse"), (1e6, "exact")])
+def test_deadline_results_are_json_and_tagged(deadline_ms: float, refinement: str) -> None:
+    out = suggest_chords(chord="G7", key="C", top=5, deadline_ms=deadline_ms)
+    assert out["refinement"] == refinement
+    json.loads(json.dumps(out["results"], allow_nan=False))
+    for result in out["results"]:
+        assert result["refinement"] == refinement
+        assert ("m" in result) == ("h" in result) == (refinement == "exact")
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from jass.tonal_tension.hierarchy import (
+    FUNCTION_LABELS,
+    IncrementalHierarchy,
+    hierarchical_tension_last,
+)
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 5, 8])
+def test_windowed_hierarchy_matches_rebuilt_tree(window: int) -> None:
+    rng = np.random.default_rng(window)
+    n = 60
+    labels = rng.choice(list(FUNCTION_LABELS), n)
+    tis = rng.normal(size=(n, 6)) + 1j * rng.normal(size=(n, 6))
+    distances = rng.choice([0.1, 0.2, 0.3], n)
+
+    live = IncrementalHierarchy(window=window)
+    for i in range(n):
+        live.append(tis[i], labels[i], distances[i])
+        rebuilt = IncrementalHierarchy()
+        for j in range(max(0, i + 1 - window), i + 1):
+            rebuilt.append(tis[j], labels[j], distances[j])
+        assert live.last_tension() == pytest.approx(rebuilt.last_tension(), abs=1e-12)
+        for label in FUNCTION_LABELS:
+            assert live.candidate_plan(label) == rebuilt.candidate_plan(label)
+
+
+@pytest.mark.parametrize("window", [None, 1, 3, 8])
+def test_hierarchy_matches_from_scratch_reference(window: int | None) -> None:
+    rng = np.random.default_rng(100 + (window or 0))
+    n, k = 40, 12
+    labels = rng.choice(list(FUNCTION_LABELS), n)
+    tis = rng.normal(size=(n, 6)) + 1j * rng.normal(size=(n, 6))
+    distances = rng.choice([0.1, 0.2, 0.3], n)
+    cand_labels = rng.choice(list(FUNCTION_LABELS), k)
+    cand_tis = rng.normal(size=(k, 6)) + 1j * rng.normal(size=(k, 6))
+    cand_distances = rng.choice([0.1, 0.2, 0.3], k)
+
+    live = IncrementalHierarchy(window=window)
+    for i in range(n):
+        live.append(tis[i], labels[i], distances[i])
+        kept = slice(0 if window is None else max(0, i + 1 - window), i + 1)
+        expected = hierarchical_tension_last(
+            tis_list=list(tis[kept]),
+            func_labels=list(labels[kept]),
+            key_distances=list(distances[kept]),
+        )
+        assert live.last_tension() == pytest.approx(expected, abs=1e-12)
+
+        per_candidate = [
+            hierarchical_tension_last(
+                tis_list=[*tis[kept], cand_tis[c]],
+                func_labels=[*labels[kept], cand_labels[c]],
+                key_distances=[*distances[kept], cand_distances[c]],
+            )
+            for c in range(k)
+        ]
+        got = live.candidate_tension(cand_tis, cand_labels, cand_distances)
+        np.testing.assert_allclose(got, per_candidate, atol=1e-12)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import pytest
+
+from jass.chord_suggestion import suggest_chords
+from jass.index_registry import IndexRegistry
+from conftest import INDEX_PATH
+
+
+def test_shared_meta_is_read_only() -> None:
+    index = IndexRegistry().get(INDEX_PATH)
+    with pytest.raises(TypeError):
+        index.meta["x"] = 1  # type: ignore[index]
+    assert not index.tis.flags.writeable
+
+
+def test_response_meta_does_not_alias_the_index() -> None:
+    out = suggest_chords(chord="G7", key="C", top=1)
+    out["meta"]["x"] = 1
+    assert "x" not in suggest_chords(chord="G7", key="C", top=1)["meta"]
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from jass.tis_index import TISIndex
+from jass.tonal_tension.features import compute_features
+from jass.tonal_tension.key_features import NUM_KEYS, key_features, key_from_id
+
+
+PROGRESSION = ("C", "Am", "F", "G7")
+
+
+@pytest.mark.parametrize("kid", range(NUM_KEYS))
+def test_compact_key_tables_match_full(
+    full_key_index: TISIndex, compact_key_index: TISIndex, kid: int
+) -> None:
+    key = key_from_id(kid)
+    full = key_features(full_key_index, *key)
+    compact = key_features(compact_key_index, *key)
+    np.testing.assert_array_equal(compact.function_codes, full.function_codes)
+    np.testing.assert_allclose(compact.d2, full.d2, atol=1e-7)
+    np.testing.assert_allclose(compact.d3, full.d3, atol=1e-7)
+
+    rows = [full_key_index.row_for_name(name) for name in PROGRESSION]
+    h_full = compute_features(
+        full_key_index, rows[-1], *key, progression_rows=rows, features=["h"]
+    )["h"]
+    h_compact = compute_features(
+        compact_key_index, rows[-1], *key, progression_rows=rows, features=["h"]
+    )["h"]
+    np.testing.assert_allclose(h_compact, h_full, atol=1e-9)
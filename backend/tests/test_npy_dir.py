@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from jass.tis_index import TISIndex
+
+
+def test_rewrite_drops_stale_optional_arrays(shipped_index: TISIndex, tmp_path: Path) -> None:
+    m = shipped_index.tis.shape[0]
+    with_table = replace(shipped_index, key_function=np.zeros((24, m), dtype=np.int8))
+    with_table.to_npy_dir(tmp_path)
+    assert (tmp_path / "key_function.npy").exists()
+
+    shipped_index.to_npy_dir(tmp_path)
+    assert not (tmp_path / "key_function.npy").exists()
+    assert TISIndex.from_npy_dir(tmp_path).key_function is None
+
+
+def test_load_ignores_foreign_npy_files(shipped_index: TISIndex, tmp_path: Path) -> None:
+    np.save(tmp_path / "scratch.npy", np.zeros(3))
+    shipped_index.to_npy_dir(tmp_path)
+    assert (tmp_path / "scratch.npy").exists()
+
+    loaded = TISIndex.from_npy_dir(tmp_path)
+    assert list(loaded.rep_names) == list(shipped_index.rep_names)
+    np.testing.assert_array_equal(loaded.tis, shipped_index.tis)
+
+
+def test_rewrite_leaves_open_index_unchanged(shipped_index: TISIndex, tmp_path: Path) -> None:
+    shipped_index.to_npy_dir(tmp_path)
+    live = TISIndex.from_npy_dir(tmp_path)
+    before = np.array(live.tis)
+
+    replace(shipped_index, tis=shipped_index.tis + 1.0).to_npy_dir(tmp_path)
+    np.testing.assert_array_equal(live.tis, before)
+    np.testing.assert_array_equal(TISIndex.from_npy_dir(tmp_path).tis, before + 1.0)
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from jass.tonal_tension import pcset_table
+from jass.tonal_tension.pcset_table import PitchClassSetTable, build_pcset_table
+
+
+@pytest.mark.parametrize("damage", [lambda data: data[: len(data) // 2], lambda data: b"junk"])
+def test_unreadable_cache_is_rebuilt(tmp_path: Path, monkeypatch, damage) -> None:
+    monkeypatch.setattr(pcset_table, "_TABLES", {})
+    path = tmp_path / "pcset_table.npz"
+    expected = build_pcset_table()
+    expected.to_npz(path)
+    path.write_bytes(damage(path.read_bytes()))
+
+    table = pcset_table.load_pcset_table(path)
+    np.testing.assert_array_equal(table.c, expected.c)
+    np.testing.assert_array_equal(PitchClassSetTable.from_npz(path).c, expected.c)
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from jass.session import SuggestionSession
+
+
+def test_query_chord_is_a_name_for_row_ids() -> None:
+    session = SuggestionSession(key="C", top=3)
+    row = session.resolve("G7")
+    by_row = session.suggest(row)
+    assert by_row["query"]["chord"] == str(session.index.rep_names[row])
+    assert by_row["results"] == session.suggest("G7")["results"]
+    assert session.suggest("G7")["query"]["chord"] == "G7"
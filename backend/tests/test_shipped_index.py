@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import numpy as np
+
+from jass.string_table import StringTable
+from jass.tis_index import TISIndex, build_tis_index
+
+
+def test_shipped_index_stores_lookup_tables(shipped_index: TISIndex) -> None:
+    for name in ("name_keys", "mask_table", "nearest_table", "note_count", "root_mask"):
+        assert getattr(shipped_index, name) is not None, name
+    assert isinstance(shipped_index.alias_names, StringTable)
+
+
+def test_shipped_index_matches_a_rebuild(
+    shipped_index: TISIndex, chords_to_bits: dict[str, list[int]]
+) -> None:
+    rebuilt = build_tis_index(chords_to_bits, weights=np.asarray(shipped_index.meta["weights"]))
+    for name in ("chroma_mask", "nearest_table", "root_mask", "slash_only", "name_rows"):
+        np.testing.assert_array_equal(getattr(rebuilt, name), getattr(shipped_index, name))
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import pytest
+
+from jass.chord_suggestion import suggest_chords
+from jass.tonal_tension.features import FEATURE_NAMES
+
+
+@pytest.mark.parametrize("key", ["G", "Am", "E", "F# minor"])
+@pytest.mark.parametrize(
+    "query", [{"chord": "G7"}, {"progression": ["C", "F", "G7"]}, {"chord": "Dm7"}]
+)
+def test_cached_features_match_uncached(key: str, query: dict) -> None:
+    uncached = suggest_chords(**query, key=key, top=40, features=FEATURE_NAMES)
+    cached = suggest_chords(**query, key=key, top=40, features=FEATURE_NAMES, cache=True)
+
+    by_row = {r["row"]: r for r in uncached["results"]}
+    tensions = sorted(round(r["tension"], 6) for r in uncached["results"])
+    assert sorted(round(r["tension"], 6) for r in cached["results"]) == tensions
+    for result in cached["results"]:
+        if result["row"] not in by_row:
+            continue  # a tie at the cutoff
+        expected = by_row[result["row"]]
+        for name in (*FEATURE_NAMES, "tension"):
+            assert result[name] == pytest.approx(expected[name], abs=1e-6), name
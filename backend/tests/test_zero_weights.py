@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from jass.chord_suggestion import suggest_chords, suggest_chords_batch, suggest_chords_profiles
+from jass.session import SuggestionSession
+from jass.tonal_tension.features import FEATURE_NAMES
+
+ZERO = {name: 0.0 for name in FEATURE_NAMES}
+
+
+def _tensions(results: list[dict]) -> list[float]:
+    return [r["tension"] for r in results]
+
+
+@pytest.mark.parametrize("query", [{"chord": "G7"}, {"progression": ["C", "F", "G7"]}])
+def test_suggest_chords_all_zero_weights(query: dict) -> None:
+    out = suggest_chords(**query, key="C", top=5, weights=ZERO)
+    assert len(out["results"]) == 5
+    assert _tensions(out["results"]) == [0.0] * 5
+
+
+def test_batch_and_profiles_all_zero_weights() -> None:
+    batch = suggest_chords_batch([("G7", "C"), ("Am", "G")], top=3, weights=ZERO)
+    assert [_tensions(q["results"]) for q in batch] == [[0.0] * 3] * 2
+
+    profiles = suggest_chords_profiles(chord="G7", key="C", top=3, profiles={"zero": ZERO})
+    assert _tensions(profiles["profiles"]["zero"]["goals"]["resolve"]) == [0.0] * 3
+
+
+def test_session_all_zero_weights() -> None:
+    session = SuggestionSession(key="C", top=4, weights=ZERO)
+    session.play("C")
+    assert _tensions(session.play("G7")["results"]) == [0.0] * 4